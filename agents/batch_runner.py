@@ -0,0 +1,212 @@
+"""Run a JSONL file of research briefs through the researcher graph.
+
+Usage:
+    python -m agents.batch_runner briefs.jsonl results.jsonl --parallelism 8
+
+Each input line is a JSON object with a brief (default field "brief") and
+optionally a run id (default field "run_id"); lines without a run id get
+a stable one derived from the brief. Results are appended to the output
+file one JSON line per run as soon as each run finishes, so an
+interrupted batch can be re-run with the same arguments and will skip
+every run_id that already completed. With --durable, runs that were cut
+off mid-graph also resume from their last checkpoint instead of starting
+over; once the batch ends, the checkpoint store is garbage-collected and
+compacted (see graph_orchestration.checkpointing.maintain_checkpoints).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import nullcontext
+from typing import Iterator
+
+from agents.search_agent import arun_research, arun_research_durable
+from graph_orchestration.checkpointing import (
+    maintain_checkpoints,
+    open_async_checkpointer,
+)
+
+
+# -------------------------
+# INPUT / RESUME
+# -------------------------
+
+
+def brief_run_id(brief: str) -> str:
+    return "brief-" + hashlib.sha256(brief.encode("utf-8")).hexdigest()[:16]
+
+
+def iter_briefs(
+    path: str, brief_field: str = "brief", id_field: str = "run_id"
+) -> Iterator[tuple[str, str]]:
+    """Lazily yield (run_id, brief) pairs from a JSONL file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_no}: invalid JSON ({e})")
+                continue
+            if not isinstance(record, dict):
+                print(f"Skipping line {line_no}: not a JSON object")
+                continue
+
+            brief = record.get(brief_field)
+            if not brief:
+                print(f"Skipping line {line_no}: no '{brief_field}' field")
+                continue
+
+            yield str(record.get(id_field) or brief_run_id(brief)), brief
+
+
+def completed_run_ids(output_path: str) -> set:
+    """run_ids already written with status "completed" (failed ones retry)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # a line cut short by an interrupted write
+                continue
+            if record.get("status") == "completed":
+                done.add(record["run_id"])
+    return done
+
+
+# -------------------------
+# EXECUTION
+# -------------------------
+
+
+async def _run_one(
+    run_id: str, brief: str, timeout: float | None, checkpointer=None
+) -> dict:
+    start = time.time()
+    try:
+        if checkpointer is not None:
+            run = arun_research_durable(brief, run_id, checkpointer)
+        else:
+            run = arun_research(brief, run_id)
+        result = await asyncio.wait_for(run, timeout)
+    except Exception as e:
+        return {
+            "run_id": run_id,
+            "status": "failed",
+            "error": f"{type(e).__name__}: {e}",
+            "duration_sec": round(time.time() - start, 2),
+        }
+
+    return {
+        "run_id": run_id,
+        "status": "completed",
+        "brief": brief,
+        "compressed_research": result.get("compressed_research", ""),
+        "final_report": result.get("final_report", ""),
+        "run_log": result.get("run_log", {}),
+        "duration_sec": round(time.time() - start, 2),
+    }
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    parallelism: int = 4,
+    timeout: float | None = None,
+    brief_field: str = "brief",
+    id_field: str = "run_id",
+    durable: bool = False,
+) -> dict:
+    """Run every pending brief with at most `parallelism` runs in flight.
+
+    Returns counts of completed, failed and skipped runs.
+    """
+    done = completed_run_ids(output_path)
+    counts = {"completed": 0, "failed": 0, "skipped": 0}
+    # bounded so a file of thousands of briefs is streamed, not loaded
+    queue: asyncio.Queue = asyncio.Queue(maxsize=parallelism * 2)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    out = open(output_path, "a", encoding="utf-8")
+
+    async def producer():
+        for run_id, brief in iter_briefs(input_path, brief_field, id_field):
+            if run_id in done:
+                counts["skipped"] += 1
+                continue
+            done.add(run_id)  # also dedupes repeated ids within the file
+            await queue.put((run_id, brief))
+        for _ in range(parallelism):
+            await queue.put(None)
+
+    async def worker(checkpointer):
+        while (item := await queue.get()) is not None:
+            record = await _run_one(*item, timeout, checkpointer)
+            counts[record["status"]] += 1
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            print(
+                f"[{record['status']}] {record['run_id']} ({record['duration_sec']}s)"
+            )
+
+    try:
+        async with (
+            open_async_checkpointer() if durable else nullcontext()
+        ) as checkpointer:
+            await asyncio.gather(
+                producer(), *(worker(checkpointer) for _ in range(parallelism))
+            )
+    finally:
+        out.close()
+
+    if durable:
+        # the async saver is closed; keeps the store from growing per run
+        maintenance = await asyncio.to_thread(maintain_checkpoints)
+        print(f"[checkpoints] {json.dumps(maintenance)}")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file of briefs")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument(
+        "--timeout", type=float, default=None, help="per-run timeout in seconds"
+    )
+    parser.add_argument("--brief-field", default="brief")
+    parser.add_argument("--id-field", default="run_id")
+    parser.add_argument(
+        "--durable",
+        action="store_true",
+        help="checkpoint runs so interrupted ones resume mid-graph",
+    )
+    args = parser.parse_args()
+
+    counts = asyncio.run(
+        run_batch(
+            args.input,
+            args.output,
+            parallelism=args.parallelism,
+            timeout=args.timeout,
+            brief_field=args.brief_field,
+            id_field=args.id_field,
+            durable=args.durable,
+        )
+    )
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
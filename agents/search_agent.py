@@ -1,8 +1,11 @@
-import json
+import asyncio
+import contextvars
+import os
 import time
 import uuid
-from langchain.chat_models import init_chat_model
+from concurrent.futures import ThreadPoolExecutor, wait
 from langgraph.graph import StateGraph, START, END
+from langchain_core.runnables import RunnableLambda
 from langchain_core.messages import (
     filter_messages,
     SystemMessage,
@@ -10,40 +13,107 @@ from langchain_core.messages import (
     HumanMessage,
     AIMessage,
 )
-from typing import Literal
-from utils.prompt import research_agent_prompt
+from typing import Literal, Optional
 from graph_orchestration.define_state import ResearcherState, ResearcherOutputState
-from tools.research_tools import think_tool, tavily_search_tool, duckduckgo_search_tool
-from utils.token_usage import update_token_metrics
+from graph_orchestration.checkpointing import run_config
+from tools.research_tools import (
+    think_tool,
+    tavily_search_tool,
+    duckduckgo_search_tool,
+    hedged_search_tool,
+)
+from utils.token_usage import call_token_metrics, empty_token_metrics, estimate_cost
+from utils.result_packing import CHARS_PER_TOKEN, SEARCH_TOKEN_BUDGET
+from utils.retrieval import relevant_context, shared_index
+from utils.call_stats import collect_call_stats, acollect_call_stats
+from utils.telemetry import emit_run_log, span, trace_context, usage_attrs
+from utils.dedup import DedupIndex, use_dedup_index
+from utils.tool_metrics import cache_statuses, empty_tool_metrics, record_tool_call
 from utils.prompt import (
     compress_research_system_prompt,
     compress_research_human_message,
+    compress_research_merge_message,
+    compress_research_excerpts_message,
+    fold_research_prompt,
+    final_report_generation_prompt,
 )
 from utils.message_formatting import get_today_str, format_messages
+from utils.model_registry import get_chat_model, get_tool_model
+from utils.prompt_assembly import (
+    assemble_messages,
+    render_system_prompt,
+    update_cache_metrics,
+)
+from utils.streaming import astream_response, stream_model_kwargs, stream_response
 
 
 # 3. Agent Construction
-tools = [think_tool, tavily_search_tool, duckduckgo_search_tool]
+# one search tool that queries Tavily and DuckDuckGo concurrently (see
+# tools.research_tools.hedged_search) instead of letting the model pick one
+HEDGED_SEARCH = True
+
+if HEDGED_SEARCH:
+    tools = [think_tool, hedged_search_tool]
+else:
+    tools = [think_tool, tavily_search_tool, duckduckgo_search_tool]
 tools_by_name = {tool.name: tool for tool in tools}
-model = init_chat_model(model="openai:gpt-4o")
-model_with_tools = model.bind_tools(tools)
-summarization_model = init_chat_model(model="openai:gpt-4.1-mini")
-compress_model = init_chat_model(
-    model="openai:gpt-4.1", max_tokens=32000
-)  # model="anthropic:claude-sonnet-4-20250514", max_tokens=64000
+
+RESEARCH_MODEL = "openai:gpt-4o"
+COMPRESS_MODEL = "openai:gpt-4.1"  # "anthropic:claude-sonnet-4-20250514"
+COMPRESS_MAX_TOKENS = 32000  # 64000 for claude-sonnet-4
+REPORT_MODEL = COMPRESS_MODEL
+REPORT_MAX_TOKENS = 16000
+
+
+# models are built on first use (see utils.model_registry), so importing
+# this module needs no API keys and constructs no clients
+def get_model_with_tools():
+    return get_tool_model(RESEARCH_MODEL, tools)
+
+
+def get_compress_model():
+    return get_chat_model(COMPRESS_MODEL, max_tokens=COMPRESS_MAX_TOKENS)
 
 
-def init_state(user_query: str) -> ResearcherState:
+def get_report_model():
+    return get_chat_model(
+        REPORT_MODEL, max_tokens=REPORT_MAX_TOKENS, **stream_model_kwargs(REPORT_MODEL)
+    )
+
+
+def init_state(user_query: str, run_id: str | None = None) -> ResearcherState:
     return {
         "researcher_messages": [HumanMessage(content=user_query)],
-        "tool_metrics": {"total_calls": 0, "by_tool": {}, "calls": []},
-        "token_metrics": {"input": 0, "output": 0, "total": 0},
+        "tool_metrics": empty_tool_metrics(),
+        "token_metrics": empty_token_metrics(),
+        "system_prompt": render_system_prompt(),
+        "seen_sources": {"urls": [], "fingerprints": []},
+        "novelty_history": [],
         "loop_count": 0,
-        "run_id": str(uuid.uuid4()),
+        "write_report": True,
+        "run_id": run_id or str(uuid.uuid4()),
         "start_time": time.time(),
     }
 
 
+def _llm_messages(state: ResearcherState, system_prompt: str) -> list:
+    return assemble_messages(system_prompt, state["researcher_messages"])
+
+
+def _llm_output(state: ResearcherState, resp, system_prompt: str):
+
+    token_metrics = call_token_metrics(resp, RESEARCH_MODEL)
+    update_cache_metrics(token_metrics, resp)
+
+    return {
+        "researcher_messages": [resp],
+        "system_prompt": system_prompt,
+        # the in-place increment in llm_call is not a state update by itself
+        "loop_count": state["loop_count"],
+        "token_metrics": token_metrics,
+    }
+
+
 def llm_call(state: ResearcherState):
     """Analyze current state and decide on next actions.
 
@@ -55,49 +125,232 @@ def llm_call(state: ResearcherState):
     """
     state["loop_count"] += 1
 
-    messages = [SystemMessage(content=research_agent_prompt)] + state[
-        "researcher_messages"
-    ]
+    # rendered once per run and reused verbatim so the request prefix stays
+    # byte-identical across turns and provider prompt caching can hit
+    system_prompt = state.get("system_prompt") or render_system_prompt()
 
-    resp = model_with_tools.invoke(messages)
-    update_token_metrics(state, resp)
+    with span("llm_call", run_id=state["run_id"], loop=state["loop_count"]) as s:
+        resp = get_model_with_tools().invoke(_llm_messages(state, system_prompt))
+        s.set(**usage_attrs(resp), tool_calls=len(resp.tool_calls))
 
-    return {"researcher_messages": [resp]}
+    return _llm_output(state, resp, system_prompt)
 
 
-def tool_node(state: ResearcherState):
-    """Execute all tool calls from the previous LLM response.
+async def allm_call(state: ResearcherState):
+    """Async variant of llm_call, used by researcher_agent.ainvoke/astream."""
+    state["loop_count"] += 1
 
-    Executes all tool calls from the previous LLM responses.
-    Returns updated state with tool execution results.
-    """
+    system_prompt = state.get("system_prompt") or render_system_prompt()
 
-    tool_calls = state["researcher_messages"][-1].tool_calls
-    observations = []
+    with span("llm_call", run_id=state["run_id"], loop=state["loop_count"]) as s:
+        resp = await get_model_with_tools().ainvoke(
+            _llm_messages(state, system_prompt)
+        )
+        s.set(**usage_attrs(resp), tool_calls=len(resp.tool_calls))
 
-    for tool_call in tool_calls:
+    return _llm_output(state, resp, system_prompt)
 
-        name = tool_call["name"]
-        args = tool_call["args"]
 
-        result = tools_by_name[name].invoke(args)
-        observations.append(result)
+# Tool calls emitted in the same turn run on a bounded thread pool so a
+# Tavily + DuckDuckGo turn costs max(latency) instead of sum(latency).
+PARALLEL_TOOL_CALLS = True
+MAX_TOOL_WORKERS = 4
+TOOL_TIMEOUT_SEC = 60
 
-        # ---- metrics ----
 
-        state["tool_metrics"]["total_calls"] += 1
+def _run_tool(tool_call) -> tuple[str, dict]:
+    with span("tool", tool=tool_call["name"]) as s:
+        started = time.perf_counter()
+        observation, call_stats = collect_call_stats(
+            tools_by_name[tool_call["name"]].invoke, tool_call["args"]
+        )
+        call_stats["latency_sec"] = time.perf_counter() - started
+        s.set(payload_chars=len(str(observation)), **cache_statuses(call_stats))
+    return observation, call_stats
 
-        state["tool_metrics"]["by_tool"].setdefault(name, 0)
-        state["tool_metrics"]["by_tool"][name] += 1
 
-        state["tool_metrics"]["calls"].append({"tool": name, "args": args})
+def _execute_tool_calls(tool_calls) -> list:
+    """Run tool calls and return (observation, call stats) pairs in call order.
+
+    All calls share one TOOL_TIMEOUT_SEC deadline, so a turn never waits
+    longer than that. A call that raises or misses the deadline yields an
+    error string instead of failing the whole turn.
+    """
+    if not tool_calls:
+        return []
+
+    started = time.perf_counter()
+    workers = min(MAX_TOOL_WORKERS, len(tool_calls)) if PARALLEL_TOOL_CALLS else 1
+    executor = ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix="tool_node",
+    )
+    # each worker gets a copy of this context so it sees the run's dedup index
+    futures = [
+        executor.submit(contextvars.copy_context().run, _run_tool, tc)
+        for tc in tool_calls
+    ]
+    done, _ = wait(futures, timeout=TOOL_TIMEOUT_SEC)
+    results = []
+
+    for tool_call, future in zip(tool_calls, futures):
+        if future not in done:
+            future.cancel()
+            results.append(
+                (
+                    f"Tool {tool_call['name']} timed out after {TOOL_TIMEOUT_SEC}s",
+                    {
+                        "error": "TimeoutError",
+                        "latency_sec": time.perf_counter() - started,
+                    },
+                )
+            )
+            continue
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(
+                (f"Tool {tool_call['name']} failed: {e}", {"error": type(e).__name__})
+            )
+
+    # don't block the turn on a stuck search; its thread finishes in the background
+    executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+async def _arun_tool(tool_call) -> tuple[str, dict]:
+    with span("tool", tool=tool_call["name"]) as s:
+        started = time.perf_counter()
+        try:
+            observation, call_stats = await acollect_call_stats(
+                tools_by_name[tool_call["name"]].ainvoke, tool_call["args"]
+            )
+        except Exception as e:
+            s.set(error=type(e).__name__)
+            return (
+                f"Tool {tool_call['name']} failed: {e}",
+                {"error": type(e).__name__, "latency_sec": time.perf_counter() - started},
+            )
+
+        call_stats["latency_sec"] = time.perf_counter() - started
+        s.set(payload_chars=len(str(observation)), **cache_statuses(call_stats))
+        return observation, call_stats
+
+
+async def _aexecute_tool_calls(tool_calls) -> list:
+    """Async counterpart of _execute_tool_calls, with the same turn deadline."""
+    if not tool_calls:
+        return []
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(MAX_TOOL_WORKERS if PARALLEL_TOOL_CALLS else 1)
+
+    async def bounded(tool_call):
+        async with semaphore:
+            return await _arun_tool(tool_call)
+
+    # tasks copy this context, so tools see the run's dedup index
+    tasks = [asyncio.ensure_future(bounded(tc)) for tc in tool_calls]
+    done, pending = await asyncio.wait(tasks, timeout=TOOL_TIMEOUT_SEC)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for tool_call, task in zip(tool_calls, tasks):
+        if task in done:
+            results.append(task.result())
+            continue
+        results.append(
+            (
+                f"Tool {tool_call['name']} timed out after {TOOL_TIMEOUT_SEC}s",
+                {
+                    "error": "TimeoutError",
+                    "latency_sec": time.perf_counter() - started,
+                },
+            )
+        )
+    return results
+
+
+def _tool_node_update(
+    state: ResearcherState, tool_calls, results, dedup_index: DedupIndex
+):
+    observations = [observation for observation, _ in results]
+
+    # ---- metrics ----
+    # only this round's calls; merge_tool_metrics folds them into the run's
+    round_metrics = empty_tool_metrics()
+    for tool_call, (observation, call_stats) in zip(tool_calls, results):
+        record_tool_call(
+            round_metrics,
+            tool_call["name"],
+            tool_call["args"],
+            str(observation),
+            call_stats,
+            loop=state["loop_count"],
+        )
 
     tool_outputs = [
         ToolMessage(content=o, name=tc["name"], tool_call_id=tc["id"])
         for o, tc in zip(observations, tool_calls)
     ]
 
-    return {"researcher_messages": tool_outputs}
+    update = {
+        "researcher_messages": tool_outputs,
+        "tool_metrics": round_metrics,
+        "seen_sources": dedup_index.to_dict(),
+    }
+
+    # ---- novelty: sources this round added vs. ones the run already had ----
+    seen_before = len((state.get("seen_sources") or {}).get("fingerprints", []))
+    new_sources = len(dedup_index.fingerprints) - seen_before
+    duplicates = sum(stats.get("duplicates_removed", 0) for _, stats in results)
+    if new_sources + duplicates:
+        update["novelty_history"] = [
+            {
+                "loop": state["loop_count"],
+                "new_sources": new_sources,
+                "duplicates": duplicates,
+                "novelty": round(new_sources / (new_sources + duplicates), 3),
+            }
+        ]
+
+    return update
+
+
+def tool_node(state: ResearcherState):
+    """Execute all tool calls from the previous LLM response.
+
+    Tool calls run concurrently (see PARALLEL_TOOL_CALLS), but observations
+    and metrics are recorded in the original call order.
+    Returns updated state with tool execution results.
+    """
+
+    tool_calls = state["researcher_messages"][-1].tool_calls
+    dedup_index = DedupIndex.from_dict(state.get("seen_sources"))
+    with (
+        use_dedup_index(dedup_index),
+        trace_context(run_id=state["run_id"], loop=state["loop_count"]),
+        span("tool_node", tool_calls=len(tool_calls)),
+    ):
+        results = _execute_tool_calls(tool_calls)
+
+    return _tool_node_update(state, tool_calls, results, dedup_index)
+
+
+async def atool_node(state: ResearcherState):
+    """Async variant of tool_node; tool calls share one turn deadline."""
+
+    tool_calls = state["researcher_messages"][-1].tool_calls
+    dedup_index = DedupIndex.from_dict(state.get("seen_sources"))
+    with (
+        use_dedup_index(dedup_index),
+        trace_context(run_id=state["run_id"], loop=state["loop_count"]),
+        span("tool_node", tool_calls=len(tool_calls)),
+    ):
+        results = await _aexecute_tool_calls(tool_calls)
+
+    return _tool_node_update(state, tool_calls, results, dedup_index)
 
 
 # -------------------------
@@ -107,56 +360,277 @@ def tool_node(state: ResearcherState):
 MAX_TOOL_CALLS = 3
 MAX_LOOPS = 3
 
+# per-run budgets (unset/0 disables): stop researching when one more
+# tool round would push the run past either of them
+MAX_RUN_TOKENS = int(os.getenv("RESEARCH_MAX_RUN_TOKENS", "0")) or None
+MAX_RUN_COST_USD = float(os.getenv("RESEARCH_MAX_RUN_COST_USD", "0")) or None
 
-def should_continue(
-    state: ResearcherState,
-) -> Literal["tool_node", "compress_research"]:
 
-    # guardrails
-    if state["tool_metrics"]["total_calls"] >= MAX_TOOL_CALLS:
-        return "compress_research"
+def _next_turn_estimate(last: AIMessage) -> tuple[int, int]:
+    """Rough (input, output) tokens of the llm_call after this tool round.
 
-    if state["loop_count"] >= MAX_LOOPS:
-        return "compress_research"
+    The next turn re-sends this turn's input and output plus the packed
+    results of every search requested now.
+    """
+    usage = last.usage_metadata or {}
+    searches = sum(1 for tc in last.tool_calls if tc["name"] != "think_tool")
+    output_tokens = usage.get("output_tokens", 0)
+    input_tokens = (
+        usage.get("input_tokens", 0) + output_tokens + searches * SEARCH_TOKEN_BUDGET
+    )
+    return input_tokens, output_tokens
+
+
+def over_budget(state: ResearcherState, last: AIMessage) -> bool:
+    """True if another research turn would exceed the run's budgets."""
+    if MAX_RUN_TOKENS is None and MAX_RUN_COST_USD is None:
+        return False
 
+    token_metrics = state["token_metrics"]
+    next_input, next_output = _next_turn_estimate(last)
+
+    if MAX_RUN_TOKENS is not None:
+        if token_metrics["total"] + next_input + next_output > MAX_RUN_TOKENS:
+            return True
+
+    if MAX_RUN_COST_USD is not None:
+        next_cost = estimate_cost(RESEARCH_MODEL, next_input, next_output)
+        if token_metrics.get("cost_usd", 0.0) + next_cost > MAX_RUN_COST_USD:
+            return True
+
+    return False
+
+
+# Adaptive stopping: instead of the fixed limits above, keep researching
+# (up to higher ceilings) while tool rounds still surface new sources, and
+# stop once a round is mostly duplicates of what the run already has.
+ADAPTIVE_STOPPING = True
+ADAPTIVE_MAX_LOOPS = 6
+ADAPTIVE_MAX_TOOL_CALLS = 12
+# share of a round's sources that must be new to justify another round
+MIN_NOVELTY = 0.3
+
+
+def stop_reason(state: ResearcherState) -> Optional[dict]:
+    """Why the research loop should stop now, or None to run the tool calls."""
     last = state["researcher_messages"][-1]
+    loops = state["loop_count"]
+    total_calls = state["tool_metrics"]["total_calls"]
+
+    if ADAPTIVE_STOPPING:
+        max_loops, max_tool_calls = ADAPTIVE_MAX_LOOPS, ADAPTIVE_MAX_TOOL_CALLS
+    else:
+        max_loops, max_tool_calls = MAX_LOOPS, MAX_TOOL_CALLS
+
+    if not last.tool_calls:
+        return {"reason": "model_finished", "loops": loops}
+
+    # guardrails
+    if total_calls >= max_tool_calls:
+        return {"reason": "max_tool_calls", "tool_calls": total_calls}
+
+    if loops >= max_loops:
+        return {"reason": "max_loops", "loops": loops}
 
-    if last.tool_calls:
-        return "tool_node"
+    if over_budget(state, last):
+        return {
+            "reason": "budget",
+            "tokens": state["token_metrics"]["total"],
+            "cost_usd": state["token_metrics"].get("cost_usd", 0.0),
+        }
 
-    return "compress_research"
+    if ADAPTIVE_STOPPING:
+        history = state.get("novelty_history") or []
+        if history and history[-1]["novelty"] < MIN_NOVELTY:
+            return {"reason": "diminishing_returns", **history[-1]}
+
+    return None
+
+
+def should_continue(
+    state: ResearcherState,
+) -> Literal["tool_node", "compress_research"]:
+
+    if stop_reason(state) is not None:
+        return "compress_research"
+
+    return "tool_node"
 
 
 # -------------------------
 # COMPRESS NODE
 # -------------------------
 
+# Fold each tool_node round into running notes (in parallel with the next
+# llm_call) so compress_research only has to merge a small final delta.
+INCREMENTAL_COMPRESSION = True
 
-def compress_research(state: ResearcherState):
+# Observations beyond this budget are not sent whole to compression or
+# report writing: only the chunks that best match each section of the
+# topic are (BM25 over the run's tool outputs, see utils.retrieval). The
+# report gets the compressed research plus excerpts from the same index.
+RETRIEVAL_CONTEXT = True
+CONTEXT_TOKEN_BUDGET = 12_000
 
-    system_msg = compress_research_system_prompt.format(date=get_today_str())
 
-    messages = (
-        [SystemMessage(content=system_msg)]
-        + state["researcher_messages"]
-        + [HumanMessage(content=compress_research_human_message)]
-    )
-    clean_messages = []
+def _research_topic(state: ResearcherState) -> str:
+    if state.get("research_topic"):
+        return state["research_topic"]
+
+    for m in state["researcher_messages"]:
+        if isinstance(m, HumanMessage):
+            return str(m.content)
+    return ""
+
+
+def _observation_documents(messages) -> list:
+    """(label, text) of every finding among messages, in order."""
+    documents = []
 
     for m in messages:
-        # Skip tool response messages
         if isinstance(m, ToolMessage):
-            continue
+            # reflections are internal reasoning, not findings
+            if m.name == "think_tool":
+                continue
+            documents.append((f"{m.name} result", str(m.content)))
+        elif isinstance(m, AIMessage) and m.content:
+            documents.append(("researcher", str(m.content)))
 
-        # Skip assistant tool-call messages
-        if isinstance(m, AIMessage) and getattr(m, "tool_calls", None):
-            continue
+    return documents
+
+
+def _format_observations(messages) -> str:
+    return "\n\n".join(
+        f"[{label}]\n{text}" for label, text in _observation_documents(messages)
+    )
+
+
+def _observations_context(
+    state: ResearcherState, start: int = 0, max_chars: int | None = None
+) -> str:
+    """Findings in researcher_messages[start:], cut down to the topic.
+
+    They are returned whole when they fit max_chars (CONTEXT_TOKEN_BUDGET
+    by default).
+    """
+    messages = state["researcher_messages"][start:]
+    if not RETRIEVAL_CONTEXT:
+        return _format_observations(messages)
+
+    documents = _observation_documents(messages)
+    # messages only grow, so run, start and length name the same documents;
+    # compression and report writing retrieve from one index
+    index = shared_index((state["run_id"], start, len(messages)), documents)
+    return relevant_context(
+        _research_topic(state),
+        documents,
+        max_chars or CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN,
+        index=index,
+    )
+
+
+def _notes_context(state: ResearcherState, notes: str, max_chars: int) -> str:
+    """Running notes, cut down to the topic when over max_chars."""
+    if not RETRIEVAL_CONTEXT or len(notes) <= max_chars:
+        return notes
+    return relevant_context(
+        _research_topic(state), [("running notes", notes)], max_chars
+    )
+
+
+def _fold_messages(state: ResearcherState) -> list:
+    new_messages = state["researcher_messages"][state.get("folded_messages", 0) :]
+
+    return [
+        HumanMessage(
+            content=fold_research_prompt.format(
+                date=get_today_str(),
+                research_topic=_research_topic(state),
+                running_notes=state.get("running_notes") or "(no notes yet)",
+                new_observations=_format_observations(new_messages),
+            )
+        )
+    ]
+
+
+def _has_new_observations(state: ResearcherState) -> bool:
+    new_messages = state["researcher_messages"][state.get("folded_messages", 0) :]
+    return bool(_format_observations(new_messages))
+
+
+def _fold_output(state: ResearcherState, resp):
+
+    return {
+        "running_notes": str(resp.content),
+        "folded_messages": len(state["researcher_messages"]),
+        "token_metrics": call_token_metrics(resp, COMPRESS_MODEL),
+    }
+
+
+def fold_research(state: ResearcherState):
+    """Fold the latest tool observations into the running compressed notes."""
+
+    if not _has_new_observations(state):
+        return {"folded_messages": len(state["researcher_messages"])}
+
+    with span("fold_research", run_id=state["run_id"], loop=state["loop_count"]) as s:
+        resp = get_compress_model().invoke(_fold_messages(state))
+        s.set(**usage_attrs(resp))
+
+    return _fold_output(state, resp)
+
+
+async def afold_research(state: ResearcherState):
+
+    if not _has_new_observations(state):
+        return {"folded_messages": len(state["researcher_messages"])}
+
+    with span("fold_research", run_id=state["run_id"], loop=state["loop_count"]) as s:
+        resp = await get_compress_model().ainvoke(_fold_messages(state))
+        s.set(**usage_attrs(resp))
 
-        clean_messages.append(m)
+    return _fold_output(state, resp)
 
-    resp = compress_model.invoke(clean_messages)
 
-    update_token_metrics(state, resp)
+def _compress_messages(state: ResearcherState) -> list:
+
+    system_msg = compress_research_system_prompt.format(date=get_today_str())
+    human_msg = compress_research_human_message.format(
+        research_topic=_research_topic(state)
+    )
+
+    if INCREMENTAL_COMPRESSION and state.get("running_notes"):
+        # notes and unfolded messages share the context budget; the notes
+        # get at most half, the messages whatever the notes leave
+        budget = CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN
+        running_notes = _notes_context(state, state["running_notes"], budget // 2)
+        merge_msg = compress_research_merge_message.format(
+            running_notes=running_notes,
+            new_observations=_observations_context(
+                state,
+                start=state.get("folded_messages", 0),
+                max_chars=budget - len(running_notes),
+            )
+            or "(none)",
+        )
+        return [
+            SystemMessage(content=system_msg),
+            HumanMessage(content=merge_msg),
+            HumanMessage(content=human_msg),
+        ]
+
+    # every finding, whole when it fits the budget (see _observations_context)
+    excerpts_msg = compress_research_excerpts_message.format(
+        excerpts=_observations_context(state) or "(none)"
+    )
+    return [
+        SystemMessage(content=system_msg),
+        HumanMessage(content=excerpts_msg),
+        HumanMessage(content=human_msg),
+    ]
+
+
+def _compress_output(state: ResearcherState, resp):
 
     raw_notes = [
         str(m.content)
@@ -169,9 +643,113 @@ def compress_research(state: ResearcherState):
     return {
         "compressed_research": str(resp.content),
         "raw_notes": ["\n".join(raw_notes)],
+        # same decision should_continue just made, kept for the run log
+        "stop_reason": stop_reason(state),
+        "token_metrics": call_token_metrics(resp, COMPRESS_MODEL),
     }
 
 
+def compress_research(state: ResearcherState):
+
+    with span("compress_research", run_id=state["run_id"]) as s:
+        resp = get_compress_model().invoke(_compress_messages(state))
+        s.set(**usage_attrs(resp), payload_chars=len(str(resp.content)))
+
+    return _compress_output(state, resp)
+
+
+async def acompress_research(state: ResearcherState):
+
+    with span("compress_research", run_id=state["run_id"]) as s:
+        resp = await get_compress_model().ainvoke(_compress_messages(state))
+        s.set(**usage_attrs(resp), payload_chars=len(str(resp.content)))
+
+    return _compress_output(state, resp)
+
+
+# -------------------------
+# FINAL REPORT
+# -------------------------
+
+# The report is streamed token by token, so callers of
+# astream(stream_mode="messages") see it while it is being written.
+
+
+def report_findings(research_brief: str, documents: list) -> str:
+    """Findings for the report prompt, cut down to the brief when over budget."""
+    findings = "\n\n".join(text for _, text in documents)
+    budget = CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN
+    if not RETRIEVAL_CONTEXT or len(findings) <= budget:
+        return findings
+    return relevant_context(research_brief, documents, budget)
+
+
+def report_messages(research_brief: str, findings: str) -> list:
+    return [
+        HumanMessage(
+            content=final_report_generation_prompt.format(
+                research_brief=research_brief,
+                findings=findings,
+                date=get_today_str(),
+            )
+        )
+    ]
+
+
+def route_after_compress(
+    state: ResearcherState,
+) -> Literal["final_report_generation", "finalize_run_log"]:
+    # sub-researchers of the supervisor graph leave the report to it
+    if state.get("write_report", True):
+        return "final_report_generation"
+    return "finalize_run_log"
+
+
+def _report_messages(state: ResearcherState) -> list:
+    topic = _research_topic(state)
+    findings = report_findings(
+        topic, [("compressed research", state["compressed_research"])]
+    )
+    # the budget the compressed research leaves goes to the tool outputs
+    # themselves, retrieved from the index compression used
+    remaining = CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN - len(findings)
+    if RETRIEVAL_CONTEXT and remaining > 0:
+        excerpts = _observations_context(state, max_chars=remaining)
+        if excerpts:
+            findings += f"\n\n<Source Excerpts>\n{excerpts}\n</Source Excerpts>"
+    return report_messages(topic, findings)
+
+
+def _report_output(state: ResearcherState, resp, timing: dict):
+
+    return {
+        "final_report": str(resp.content),
+        "report_timing": timing,
+        "token_metrics": call_token_metrics(resp, REPORT_MODEL),
+    }
+
+
+def final_report_generation(state: ResearcherState):
+    """Write the user-facing report from the compressed research."""
+
+    messages = _report_messages(state)
+    with span("final_report_generation", run_id=state["run_id"]) as s:
+        resp, timing = stream_response(get_report_model(), messages)
+        s.set(**usage_attrs(resp), **timing, payload_chars=len(str(resp.content)))
+
+    return _report_output(state, resp, timing)
+
+
+async def afinal_report_generation(state: ResearcherState):
+
+    messages = _report_messages(state)
+    with span("final_report_generation", run_id=state["run_id"]) as s:
+        resp, timing = await astream_response(get_report_model(), messages)
+        s.set(**usage_attrs(resp), **timing, payload_chars=len(str(resp.content)))
+
+    return _report_output(state, resp, timing)
+
+
 # -------------------------
 # FINALIZE LOG
 # -------------------------
@@ -184,18 +762,20 @@ def finalize_run_log(state: ResearcherState):
     log = {
         "run_id": state["run_id"],
         "loops": state["loop_count"],
+        "stop_reason": state.get("stop_reason"),
+        "novelty": state.get("novelty_history", []),
+        # time to first token and total time of the streamed report
+        "report": state.get("report_timing"),
         "tool_metrics": state["tool_metrics"],
         "token_metrics": state["token_metrics"],
         "duration_sec": round(duration, 2),
     }
 
-    print("\n===== AGENT RUN LOG =====")
-    print(json.dumps(log, indent=2))
-
-    # optional: persist
-    # redis.set(f"agent_log:{state['run_id']}", json.dumps(log))
+    # exported to the sinks configured in utils.telemetry (JSONL file,
+    # Prometheus, OpenTelemetry, console); a no-op when none are enabled
+    emit_run_log(log)
 
-    return {}
+    return {"run_log": log}
 
 
 # ===== GRAPH CONSTRUCTION =====
@@ -204,10 +784,34 @@ agent_builder = StateGraph(ResearcherState, output_schema=ResearcherOutputState)
 
 # ---- nodes ----
 agent_builder.add_node("init_state", init_state)
-agent_builder.add_node("llm_call", llm_call)
-agent_builder.add_node("tool_node", tool_node)
-agent_builder.add_node("compress_research", compress_research)
+# sync + async implementations: invoke/stream use the former,
+# ainvoke/astream the latter so one event loop can serve many runs
+agent_builder.add_node(
+    "llm_call", RunnableLambda(llm_call, afunc=allm_call, name="llm_call")
+)
+agent_builder.add_node(
+    "tool_node", RunnableLambda(tool_node, afunc=atool_node, name="tool_node")
+)
+agent_builder.add_node(
+    "compress_research",
+    RunnableLambda(
+        compress_research, afunc=acompress_research, name="compress_research"
+    ),
+)
+agent_builder.add_node(
+    "final_report_generation",
+    RunnableLambda(
+        final_report_generation,
+        afunc=afinal_report_generation,
+        name="final_report_generation",
+    ),
+)
 agent_builder.add_node("finalize_run_log", finalize_run_log)
+if INCREMENTAL_COMPRESSION:
+    agent_builder.add_node(
+        "fold_research",
+        RunnableLambda(fold_research, afunc=afold_research, name="fold_research"),
+    )
 
 # ---- edges ----
 
@@ -224,7 +828,21 @@ agent_builder.add_conditional_edges(
 
 agent_builder.add_edge("tool_node", "llm_call")
 
-agent_builder.add_edge("compress_research", "finalize_run_log")
+if INCREMENTAL_COMPRESSION:
+    # runs in the same superstep as the next llm_call, so folding is
+    # finished before compress_research can be scheduled
+    agent_builder.add_edge("tool_node", "fold_research")
+    agent_builder.add_edge("fold_research", END)
+
+agent_builder.add_conditional_edges(
+    "compress_research",
+    route_after_compress,
+    {
+        "final_report_generation": "final_report_generation",
+        "finalize_run_log": "finalize_run_log",
+    },
+)
+agent_builder.add_edge("final_report_generation", "finalize_run_log")
 agent_builder.add_edge("finalize_run_log", END)
 
 
@@ -232,9 +850,76 @@ agent_builder.add_edge("finalize_run_log", END)
 researcher_agent = agent_builder.compile()
 
 
-# Example brief
-research_brief = """I want to research about a potential client for a presales pitch. The company I want to research is JAMF, I want everything from tge market it serves to the work it does, to its clients, excecutives what they post on linkdin and any thing else that must be required to understand to design  a presales pitch"""
-state = init_state(research_brief)
+def build_researcher_agent(checkpointer=None):
+    """Compile the researcher graph, optionally with a durable checkpointer."""
+    return agent_builder.compile(checkpointer=checkpointer)
+
+
+async def arun_research(research_brief: str, run_id: str | None = None) -> dict:
+    """Run one research job on the current event loop.
+
+    Many of these can be awaited concurrently (e.g. with asyncio.gather),
+    since every node awaits its model and tool calls.
+    """
+    return await researcher_agent.ainvoke(init_state(research_brief, run_id))
+
+
+async def astream_research(
+    research_brief: str, run_id: str | None = None, stream_mode: str = "updates"
+):
+    """Yield node-level updates of a research job as they complete."""
+    async for chunk in researcher_agent.astream(
+        init_state(research_brief, run_id), stream_mode=stream_mode
+    ):
+        yield chunk
+
+
+# -------------------------
+# DURABLE RUNS
+# -------------------------
+
+
+def _finished_output(values: dict) -> dict:
+    """Project a finished run's checkpointed state onto the graph's output schema."""
+    return {k: values[k] for k in ResearcherOutputState.__annotations__ if k in values}
 
-result = researcher_agent.invoke(state)
-format_messages(result["researcher_messages"])
+
+def run_research_durable(research_brief: str, run_id: str, checkpointer) -> dict:
+    """Run research with checkpoints keyed by run_id, resuming if possible.
+
+    If a previous attempt with this run_id crashed or timed out, execution
+    continues after its last completed node: finished LLM turns and tool
+    results are read back from the checkpoint instead of being re-requested
+    from OpenAI/Tavily. A run_id that already finished returns its output again.
+    """
+    graph = build_researcher_agent(checkpointer)
+    config = run_config(run_id)
+    snapshot = graph.get_state(config)
+
+    if snapshot.next:
+        return graph.invoke(None, config)
+    if snapshot.values:
+        return _finished_output(snapshot.values)
+    return graph.invoke(init_state(research_brief, run_id), config)
+
+
+async def arun_research_durable(
+    research_brief: str, run_id: str, checkpointer
+) -> dict:
+    """Async counterpart of run_research_durable (use an AsyncSqliteSaver)."""
+    graph = build_researcher_agent(checkpointer)
+    config = run_config(run_id)
+    snapshot = await graph.aget_state(config)
+
+    if snapshot.next:
+        return await graph.ainvoke(None, config)
+    if snapshot.values:
+        return _finished_output(snapshot.values)
+    return await graph.ainvoke(init_state(research_brief, run_id), config)
+
+
+if __name__ == "__main__":
+    # Example brief
+    research_brief = """I want to research about a potential client for a presales pitch. The company I want to research is JAMF, I want everything from tge market it serves to the work it does, to its clients, excecutives what they post on linkdin and any thing else that must be required to understand to design  a presales pitch"""
+    result = asyncio.run(arun_research(research_brief))
+    format_messages(result["researcher_messages"])
@@ -0,0 +1,378 @@
+"""Supervisor graph: split a brief into subtopics and research them in parallel.
+
+The supervisor model (prompted with lead_researcher_prompt) delegates
+subtopics by calling ConductResearch. Every call of a turn is sent to its
+own researcher_agent subgraph with LangGraph's Send, so the subtopics of
+one turn run concurrently and the turn takes about as long as its slowest
+subtopic. Their compressed findings come back to the supervisor as tool
+results; once it calls ResearchComplete (or runs out of iterations) the
+findings are merged into a final report.
+"""
+
+import asyncio
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from agents.search_agent import (
+    REPORT_MODEL,
+    RESEARCH_MODEL,
+    get_report_model,
+    init_state,
+    report_findings,
+    report_messages,
+    researcher_agent,
+)
+from graph_orchestration.define_state import (
+    ResearchTask,
+    SupervisorOutputState,
+    SupervisorState,
+)
+from tools.research_tools import think_tool
+from utils.message_formatting import get_today_str
+from utils.model_registry import get_tool_model
+from utils.prompt import lead_researcher_prompt
+from utils.structured_output_schema import ConductResearch, ResearchComplete
+from utils.streaming import astream_response, stream_response
+from utils.telemetry import emit_run_log, span, trace_context, usage_attrs
+from utils.token_usage import call_token_metrics, empty_token_metrics
+
+
+SUPERVISOR_MODEL = RESEARCH_MODEL
+
+# ConductResearch calls run in parallel per supervisor turn; calls beyond
+# the cap are answered with an error so the supervisor re-issues them later
+MAX_CONCURRENT_RESEARCH_UNITS = 3
+# supervisor turns (think_tool + ConductResearch rounds) before reporting
+MAX_RESEARCHER_ITERATIONS = 6
+
+supervisor_tools = [ConductResearch, ResearchComplete, think_tool]
+
+
+def get_supervisor_model():
+    return get_tool_model(SUPERVISOR_MODEL, supervisor_tools)
+
+
+def render_supervisor_prompt() -> str:
+    return lead_researcher_prompt.format(
+        date=get_today_str(),
+        max_concurrent_research_units=MAX_CONCURRENT_RESEARCH_UNITS,
+        max_researcher_iterations=MAX_RESEARCHER_ITERATIONS,
+    )
+
+
+def init_supervisor_state(
+    research_brief: str, run_id: str | None = None
+) -> SupervisorState:
+    return {
+        "supervisor_messages": [HumanMessage(content=research_brief)],
+        "research_brief": research_brief,
+        "system_prompt": render_supervisor_prompt(),
+        "research_iterations": 0,
+        "token_metrics": empty_token_metrics(),
+        "run_id": run_id or str(uuid.uuid4()),
+        "start_time": time.time(),
+    }
+
+
+# -------------------------
+# SUPERVISOR NODE
+# -------------------------
+
+
+def _supervisor_messages(state: SupervisorState) -> list:
+    system_prompt = state.get("system_prompt") or render_supervisor_prompt()
+    return [SystemMessage(content=system_prompt)] + list(state["supervisor_messages"])
+
+
+def _supervisor_output(state: SupervisorState, resp):
+
+    return {
+        "supervisor_messages": [resp],
+        "research_iterations": state["research_iterations"] + 1,
+        "token_metrics": call_token_metrics(resp, SUPERVISOR_MODEL),
+    }
+
+
+def supervisor(state: SupervisorState):
+    """Plan the research and delegate subtopics with ConductResearch calls."""
+
+    with span(
+        "supervisor", run_id=state["run_id"], loop=state["research_iterations"] + 1
+    ) as s:
+        resp = get_supervisor_model().invoke(_supervisor_messages(state))
+        s.set(**usage_attrs(resp), tool_calls=len(resp.tool_calls))
+
+    return _supervisor_output(state, resp)
+
+
+async def asupervisor(state: SupervisorState):
+
+    with span(
+        "supervisor", run_id=state["run_id"], loop=state["research_iterations"] + 1
+    ) as s:
+        resp = await get_supervisor_model().ainvoke(_supervisor_messages(state))
+        s.set(**usage_attrs(resp), tool_calls=len(resp.tool_calls))
+
+    return _supervisor_output(state, resp)
+
+
+# -------------------------
+# ROUTER
+# -------------------------
+
+
+def _research_calls(last: AIMessage) -> tuple[list, list]:
+    """ConductResearch calls of a turn, split into (run now, over the cap)."""
+    calls = [c for c in last.tool_calls if c["name"] == ConductResearch.__name__]
+    return (
+        calls[:MAX_CONCURRENT_RESEARCH_UNITS],
+        calls[MAX_CONCURRENT_RESEARCH_UNITS:],
+    )
+
+
+def route_supervisor(state: SupervisorState):
+    """Fan ConductResearch calls out to sub-researchers, or go to the report."""
+    last = state["supervisor_messages"][-1]
+
+    if (
+        not last.tool_calls
+        or any(c["name"] == ResearchComplete.__name__ for c in last.tool_calls)
+        or state["research_iterations"] >= MAX_RESEARCHER_ITERATIONS
+    ):
+        return "final_report_generation"
+
+    run_now, _ = _research_calls(last)
+    sends = [
+        Send(
+            "researcher",
+            {
+                "research_topic": c["args"]["research_topic"],
+                "tool_call_id": c["id"],
+                # stable per call, so durable runs resume the same sub-runs
+                "run_id": f"{state['run_id']}:{c['id']}",
+            },
+        )
+        for c in run_now
+    ]
+    if len(run_now) < len(last.tool_calls):
+        # think_tool reflections and over-the-cap calls
+        sends.append(Send("supervisor_tools", state))
+    return sends
+
+
+# -------------------------
+# TOOL NODES
+# -------------------------
+
+
+def supervisor_tools_node(state: SupervisorState):
+    """Answer the supervisor's tool calls that are not run as sub-researchers."""
+    last = state["supervisor_messages"][-1]
+    _, over_cap = _research_calls(last)
+    over_cap_ids = {c["id"] for c in over_cap}
+
+    messages = []
+    for call in last.tool_calls:
+        if call["name"] == think_tool.name:
+            content = think_tool.invoke(call["args"])
+        elif call["id"] in over_cap_ids:
+            content = (
+                f"Error: not run, at most {MAX_CONCURRENT_RESEARCH_UNITS} "
+                "ConductResearch calls are allowed per turn. Call it again if "
+                "this subtopic is still needed."
+            )
+        else:
+            continue
+        messages.append(
+            ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+        )
+
+    return {"supervisor_messages": messages}
+
+
+def _research_input(task: ResearchTask) -> dict:
+    return {
+        **init_state(task["research_topic"], task["run_id"]),
+        "research_topic": task["research_topic"],
+        # the supervisor writes one report from every subtopic's findings
+        "write_report": False,
+    }
+
+
+def _research_output(task: ResearchTask, result: dict):
+    compressed = result.get("compressed_research", "")
+    run_log = result.get("run_log", {})
+
+    return {
+        "supervisor_messages": [
+            ToolMessage(
+                content=compressed,
+                name=ConductResearch.__name__,
+                tool_call_id=task["tool_call_id"],
+            )
+        ],
+        "notes": [compressed],
+        "raw_notes": result.get("raw_notes", []),
+        "sub_runs": [{"research_topic": task["research_topic"], **run_log}],
+    }
+
+
+def conduct_research(task: ResearchTask):
+    """Run one researcher_agent subgraph for a ConductResearch call."""
+
+    with span("researcher", run_id=task["run_id"]):
+        result = researcher_agent.invoke(_research_input(task))
+
+    return _research_output(task, result)
+
+
+async def aconduct_research(task: ResearchTask):
+
+    with span("researcher", run_id=task["run_id"]):
+        result = await researcher_agent.ainvoke(_research_input(task))
+
+    return _research_output(task, result)
+
+
+# -------------------------
+# FINAL REPORT
+# -------------------------
+
+
+def _report_messages(state: SupervisorState) -> list:
+    notes = [
+        (f"subtopic {i}", note) for i, note in enumerate(state.get("notes", []), 1)
+    ]
+    findings = report_findings(state["research_brief"], notes)
+    return report_messages(state["research_brief"], findings)
+
+
+def _report_output(state: SupervisorState, resp, timing: dict):
+
+    return {
+        "final_report": str(resp.content),
+        "report_timing": timing,
+        "token_metrics": call_token_metrics(resp, REPORT_MODEL),
+    }
+
+
+def final_report_generation(state: SupervisorState):
+    """Merge the sub-researchers' compressed findings into one streamed report."""
+
+    with span("final_report_generation", run_id=state["run_id"]) as s:
+        resp, timing = stream_response(get_report_model(), _report_messages(state))
+        s.set(**usage_attrs(resp), **timing, payload_chars=len(str(resp.content)))
+
+    return _report_output(state, resp, timing)
+
+
+async def afinal_report_generation(state: SupervisorState):
+
+    with span("final_report_generation", run_id=state["run_id"]) as s:
+        resp, timing = await astream_response(
+            get_report_model(), _report_messages(state)
+        )
+        s.set(**usage_attrs(resp), **timing, payload_chars=len(str(resp.content)))
+
+    return _report_output(state, resp, timing)
+
+
+def finalize_supervisor_log(state: SupervisorState):
+
+    duration = time.time() - state["start_time"]
+    sub_runs = state.get("sub_runs", [])
+
+    log = {
+        "run_id": state["run_id"],
+        "graph": "supervisor",
+        "iterations": state["research_iterations"],
+        "subtopics": [
+            {
+                "research_topic": r["research_topic"],
+                "run_id": r.get("run_id"),
+                "loops": r.get("loops"),
+                "duration_sec": r.get("duration_sec"),
+                "stop_reason": r.get("stop_reason"),
+                "tokens": r.get("token_metrics", {}).get("total", 0),
+                "cost_usd": r.get("token_metrics", {}).get("cost_usd", 0.0),
+            }
+            for r in sub_runs
+        ],
+        "report": state.get("report_timing"),
+        # supervisor and report calls only; sub-runs are listed above
+        "token_metrics": state["token_metrics"],
+        "total_tokens": state["token_metrics"]["total"]
+        + sum(r.get("token_metrics", {}).get("total", 0) for r in sub_runs),
+        "duration_sec": round(duration, 2),
+    }
+
+    emit_run_log(log)
+
+    return {"run_log": log}
+
+
+# ===== GRAPH CONSTRUCTION =====
+
+supervisor_builder = StateGraph(SupervisorState, output_schema=SupervisorOutputState)
+
+# ---- nodes ----
+supervisor_builder.add_node(
+    "supervisor", RunnableLambda(supervisor, afunc=asupervisor, name="supervisor")
+)
+supervisor_builder.add_node("supervisor_tools", supervisor_tools_node)
+supervisor_builder.add_node(
+    "researcher",
+    RunnableLambda(conduct_research, afunc=aconduct_research, name="researcher"),
+    input_schema=ResearchTask,
+)
+supervisor_builder.add_node(
+    "final_report_generation",
+    RunnableLambda(
+        final_report_generation,
+        afunc=afinal_report_generation,
+        name="final_report_generation",
+    ),
+)
+supervisor_builder.add_node("finalize_supervisor_log", finalize_supervisor_log)
+
+# ---- edges ----
+supervisor_builder.add_edge(START, "supervisor")
+supervisor_builder.add_conditional_edges(
+    "supervisor",
+    route_supervisor,
+    ["researcher", "supervisor_tools", "final_report_generation"],
+)
+# every branch of a turn finishes before the supervisor runs again
+supervisor_builder.add_edge("researcher", "supervisor")
+supervisor_builder.add_edge("supervisor_tools", "supervisor")
+supervisor_builder.add_edge("final_report_generation", "finalize_supervisor_log")
+supervisor_builder.add_edge("finalize_supervisor_log", END)
+
+# ---- compile ----
+supervisor_agent = supervisor_builder.compile()
+
+
+def build_supervisor_agent(checkpointer=None):
+    """Compile the supervisor graph, optionally with a durable checkpointer."""
+    return supervisor_builder.compile(checkpointer=checkpointer)
+
+
+async def arun_supervised_research(
+    research_brief: str, run_id: str | None = None
+) -> dict:
+    """Research a broad brief with parallel sub-researchers on this event loop."""
+    with trace_context(graph="supervisor"):
+        return await supervisor_agent.ainvoke(
+            init_supervisor_state(research_brief, run_id)
+        )
+
+
+if __name__ == "__main__":
+    research_brief = """I want to research about a potential client for a presales pitch. The company I want to research is JAMF, I want everything from tge market it serves to the work it does, to its clients, excecutives what they post on linkdin and any thing else that must be required to understand to design  a presales pitch"""
+    result = asyncio.run(arun_supervised_research(research_brief))
+    print(result["final_report"])
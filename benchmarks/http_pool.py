@@ -0,0 +1,252 @@
+"""Connection reuse benchmark: fresh connection per search vs pooled session.
+
+Usage:
+    python -m benchmarks.http_pool --concurrency 1 8 32 --tls --out pool.json
+    python -m benchmarks.http_pool --url https://api.tavily.com/search
+
+By default a local HTTP/1.1 server stands in for a search API: it answers
+each POST with a JSON payload and counts the TCP connections it accepts.
+--tls serves it over TLS with a throwaway self-signed certificate (needs
+the openssl CLI), and --connect-delay adds a fixed cost to every new
+connection to mimic the extra round trips of a remote handshake.
+--url sends the requests to a real endpoint instead; the status code is
+ignored, only the timing and connection counts matter.
+
+Each concurrency level runs the same requests twice:
+    fresh   requests.post, a new connection each time (the stock wrappers)
+    pooled  utils.http_pool.get_http_session, keep-alive connections
+
+Reported per mode: requests/sec, latency percentiles, connections opened
+and handshakes saved (requests that reused a live connection).
+"""
+
+import argparse
+import json
+import os
+import platform
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import requests
+import urllib3
+
+from benchmarks.research_graph import _distribution, _git_commit
+from utils.http_pool import get_http_session, pool_stats
+
+
+# -------------------------
+# LOCAL SEARCH API
+# -------------------------
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = self.server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalSearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, payload_bytes: int, connect_delay_sec: float, tls: bool):
+        super().__init__(("127.0.0.1", 0), _SearchHandler)
+        self.payload = json.dumps(
+            {"results": [{"content": "x" * max(0, payload_bytes - 32)}]}
+        ).encode()
+        self.connect_delay_sec = connect_delay_sec
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._certs = None
+        if tls:
+            self._certs = tempfile.TemporaryDirectory()
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*_self_signed_cert(self._certs.name))
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+        scheme = "https" if tls else "http"
+        self.url = f"{scheme}://127.0.0.1:{self.server_address[1]}/search"
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+        if self.connect_delay_sec:
+            time.sleep(self.connect_delay_sec)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        if self._certs is not None:
+            self._certs.cleanup()
+
+
+def _self_signed_cert(directory: str) -> tuple:
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-keyout",
+            key,
+            "-out",
+            cert,
+            "-days",
+            "1",
+            "-subj",
+            "/CN=127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+# -------------------------
+# MEASUREMENT
+# -------------------------
+
+
+def _send(post, url: str, body: dict) -> float:
+    started = time.perf_counter()
+    response = post(url, json=body, verify=False, timeout=30)
+    response.content
+    return time.perf_counter() - started
+
+
+def measure_mode(
+    mode: str,
+    url: str,
+    concurrency: int,
+    requests_per_level: int,
+    server: Optional[LocalSearchServer],
+) -> dict:
+    # a new shared session per level, so its counters start at zero
+    session_name = f"bench-c{concurrency}"
+    if mode == "pooled":
+        post = get_http_session(session_name).post
+    else:
+        post = requests.post
+
+    opened_before = server.connections if server else 0
+    bodies = [{"query": f"benchmark query {i}"} for i in range(requests_per_level)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda body: _send(post, url, body), bodies))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "mode": mode,
+        "requests": requests_per_level,
+        "elapsed_sec": round(elapsed, 4),
+        "requests_per_sec": round(requests_per_level / elapsed, 2),
+        "latency": _distribution(latencies),
+    }
+    if mode == "pooled":
+        result.update(pool_stats(get_http_session(session_name)))
+    else:
+        result["connections_opened"] = requests_per_level
+        result["handshakes_saved"] = 0
+    if server:
+        # ground truth from the server side
+        result["connections_opened"] = server.connections - opened_before
+        result["handshakes_saved"] = requests_per_level - result["connections_opened"]
+    return result
+
+
+def run_benchmark(args) -> dict:
+    # the local certificate is self-signed
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    server = None
+    if not args.url:
+        server = LocalSearchServer(args.payload_bytes, args.connect_delay, args.tls)
+        server.__enter__()
+    url = args.url or server.url
+
+    levels = []
+    try:
+        for concurrency in args.concurrency:
+            fresh, pooled = (
+                measure_mode(mode, url, concurrency, args.requests, server)
+                for mode in ("fresh", "pooled")
+            )
+            levels.append(
+                {
+                    "concurrency": concurrency,
+                    "fresh": fresh,
+                    "pooled": pooled,
+                    "speedup": round(fresh["elapsed_sec"] / pooled["elapsed_sec"], 2),
+                    "mean_latency_saved_sec": round(
+                        fresh["latency"]["mean_sec"] - pooled["latency"]["mean_sec"], 4
+                    ),
+                }
+            )
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+
+    return {
+        "benchmark": "http_pool",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            "url": args.url or "local",
+            "tls": bool(args.url and args.url.startswith("https")) or args.tls,
+            "connect_delay_sec": args.connect_delay,
+            "payload_bytes": args.payload_bytes,
+            "requests_per_level": args.requests,
+        },
+        "levels": levels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument("--connect-delay", type=float, default=0.0)
+    parser.add_argument("--payload-bytes", type=int, default=16_000)
+    parser.add_argument("--url", help="benchmark a real endpoint instead")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    output = json.dumps(run_benchmark(args), indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
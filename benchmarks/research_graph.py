@@ -0,0 +1,496 @@
+"""End-to-end benchmark of the researcher graph with local stand-ins.
+
+Usage:
+    python -m benchmarks.research_graph --concurrency 1 4 16 --out bench.json
+
+The real graph (researcher_agent, all of its nodes, tools, caches, dedup
+and packing) runs against a fake chat model and fake Tavily and DuckDuckGo
+clients, each with a configurable latency, so no network or API key is
+needed.
+Search responses are built from a recorded Tavily payload (response.json,
+~246 KB) with each page's words reshuffled per query, which keeps the
+size and vocabulary realistic while making every query's results distinct
+to the dedup index.
+
+Reported:
+    - per-node wall time (count, mean, p50, p95, total)
+    - runs/sec and run latency percentiles at each concurrency level
+    - peak Python heap of a single run (tracemalloc) and process max RSS
+    - bytes of message state and of the whole final state
+
+Results are written as JSON together with the git commit, so runs of
+different commits can be compared side by side.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+
+# keep benchmark runs away from the developer's caches and recordings;
+# must be set before the agent modules read them at import time
+os.environ.setdefault("RESEARCH_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+os.environ["RESEARCH_CASSETTE_MODE"] = "off"
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import agents.search_agent as search_agent
+import tools.research_tools as research_tools
+from utils import model_registry, resilience
+from utils.result_packing import CHARS_PER_TOKEN
+from utils.streaming import stream_model_kwargs
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+
+@dataclass
+class BenchConfig:
+    concurrency: list = field(default_factory=lambda: [1, 4, 16])
+    runs_per_level: int = 16
+    llm_latency_sec: float = 0.05
+    search_latency_sec: float = 0.2
+    # DuckDuckGo stand-in, queried alongside Tavily by the hedged search tool
+    ddg_latency_sec: float = 0.1
+    search_loops: int = 2
+    reply_words: int = 200
+    payload_path: str = "response.json"
+    # multiplies the raw_content of every result, e.g. 2.0 ~ a 490 KB payload
+    payload_scale: float = 1.0
+    # let repeated queries hit the search cache instead of the fake client
+    warm_cache: bool = False
+    # keep the production provider rate limits (utils.resilience); off by
+    # default so the numbers measure the graph, not the token buckets
+    rate_limits: bool = False
+
+
+# -------------------------
+# FAKE SEARCH
+# -------------------------
+
+
+def _reshuffle(text: str, rng: random.Random, scale: float) -> str:
+    words = text.split()
+    if scale != 1.0:
+        words = (words * (int(scale) + 1))[: max(1, int(len(words) * scale))]
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def make_search_payload(template: dict, query: str, scale: float = 1.0) -> dict:
+    """Derive a distinct but equally sized Tavily response for query."""
+    rng = random.Random(query)
+    payload = copy.deepcopy(template)
+    payload["query"] = query
+    for i, result in enumerate(payload.get("results", [])):
+        result["url"] = (
+            f"{result['url'].rstrip('/')}/bench-{rng.getrandbits(32):08x}-{i}"
+        )
+        result["content"] = _reshuffle(result.get("content") or "", rng, 1.0)
+        result["raw_content"] = _reshuffle(result.get("raw_content") or "", rng, scale)
+    return payload
+
+
+class FakeSearchClient:
+    """Stands in for TavilySearch: fixed latency, realistic payload."""
+
+    def __init__(self, template: dict, latency_sec: float, scale: float = 1.0):
+        self.template = template
+        self.latency_sec = latency_sec
+        self.scale = scale
+        self.calls = 0
+        self._payloads: dict = {}
+        self._lock = threading.Lock()
+
+    def invoke(self, query: str) -> dict:
+        with self._lock:
+            self.calls += 1
+            # built once per query so generating fakes stays out of the timings
+            if query not in self._payloads:
+                self._payloads[query] = make_search_payload(
+                    self.template, query, self.scale
+                )
+            payload = self._payloads[query]
+        time.sleep(self.latency_sec)
+        return copy.deepcopy(payload)
+
+
+class FakeDuckDuckGoClient:
+    """Stands in for DuckDuckGoSearchResults: snippet-only result list."""
+
+    def __init__(self, template: dict, latency_sec: float, max_results: int = 10):
+        self.latency_sec = latency_sec
+        self.max_results = max_results
+        self.results = [
+            {
+                "title": r.get("title", ""),
+                "link": r["url"],
+                "snippet": (r.get("content") or "")[:300],
+            }
+            for r in template.get("results", [])
+        ]
+        self.calls = 0
+
+    def invoke(self, query: str) -> list:
+        self.calls += 1
+        time.sleep(self.latency_sec)
+        rng = random.Random(query)
+        return [
+            {**r, "link": f"{r['link'].rstrip('/')}/ddg-{rng.getrandbits(32):08x}"}
+            for r in self.results[: self.max_results]
+        ]
+
+
+# -------------------------
+# FAKE CHAT MODEL
+# -------------------------
+
+
+# whichever search tool the graph exposes (hedged or Tavily)
+SEARCH_TOOL = next(t.name for t in search_agent.tools if t.name != "think_tool")
+
+
+class FakeResearchModel(BaseChatModel):
+    """Deterministic, stateless chat model with a fixed per-call latency.
+
+    While fewer than search_loops tool-calling turns are in the history it
+    asks for a search plus a reflection; after that it answers with
+    reply_words of text. Being stateless, one instance serves any number
+    of concurrent runs.
+    """
+
+    latency_sec: float = 0.05
+    search_loops: int = 0
+    reply_words: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages: list[BaseMessage]) -> ChatResult:
+        turns = sum(1 for m in messages if isinstance(m, AIMessage) and m.tool_calls)
+        input_chars = sum(len(str(m.content)) for m in messages)
+
+        if turns < self.search_loops:
+            content = ""
+            tool_calls = [
+                {
+                    "name": SEARCH_TOOL,
+                    "args": {"query": f"benchmark query {turns}"},
+                    "id": f"search-{turns}",
+                },
+                {
+                    "name": "think_tool",
+                    "args": {"reflection": f"Reviewed results of search {turns}."},
+                    "id": f"think-{turns}",
+                },
+            ]
+        else:
+            content = " ".join(["finding"] * self.reply_words)
+            tool_calls = []
+
+        input_tokens = input_chars // CHARS_PER_TOKEN
+        output_tokens = len(content) // CHARS_PER_TOKEN + 20 * len(tool_calls)
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency_sec)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency_sec)
+        return self._respond(messages)
+
+
+def install_fakes(config: BenchConfig) -> FakeSearchClient:
+    """Point the graph's model registry and search clients at the fakes."""
+    with open(config.payload_path, "r", encoding="utf-8") as f:
+        template = json.load(f)
+
+    model_registry.reset()
+    if not config.rate_limits:
+        resilience.PROVIDER_RATE_LIMITS = {
+            provider: (1e9, 1e9) for provider in resilience.PROVIDER_RATE_LIMITS
+        }
+    model_registry.register(
+        model_registry.chat_model_key(search_agent.RESEARCH_MODEL),
+        FakeResearchModel(
+            latency_sec=config.llm_latency_sec,
+            search_loops=config.search_loops,
+            reply_words=config.reply_words,
+        ),
+    )
+    model_registry.register(
+        model_registry.chat_model_key(
+            search_agent.COMPRESS_MODEL, max_tokens=search_agent.COMPRESS_MAX_TOKENS
+        ),
+        FakeResearchModel(
+            latency_sec=config.llm_latency_sec, reply_words=config.reply_words
+        ),
+    )
+    model_registry.register(
+        model_registry.chat_model_key(
+            search_agent.REPORT_MODEL,
+            max_tokens=search_agent.REPORT_MAX_TOKENS,
+            **stream_model_kwargs(search_agent.REPORT_MODEL),
+        ),
+        FakeResearchModel(
+            latency_sec=config.llm_latency_sec, reply_words=config.reply_words
+        ),
+    )
+
+    search_client = FakeSearchClient(
+        template, config.search_latency_sec, config.payload_scale
+    )
+    ddg_client = FakeDuckDuckGoClient(template, config.ddg_latency_sec)
+    research_tools.get_tavily_client = lambda *args, **kwargs: search_client
+    research_tools.get_duckduckgo_results_client = lambda *args, **kwargs: ddg_client
+    research_tools.SEARCH_CACHE_BYPASS = not config.warm_cache
+    return search_client
+
+
+# -------------------------
+# MEASUREMENT
+# -------------------------
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Collects wall time of every graph node invocation by node name."""
+
+    def __init__(self):
+        self.durations: dict[str, list] = {}
+        self._open: dict = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        node = (metadata or {}).get("langgraph_node")
+        # only the node's own run, not same-named runnables nested inside it
+        if node and kwargs.get("name") == node:
+            with self._lock:
+                if parent_run_id not in self._open:
+                    self._open[run_id] = (node, time.perf_counter())
+
+    def _close(self, run_id):
+        with self._lock:
+            started = self._open.pop(run_id, None)
+            if started:
+                node, t0 = started
+                self.durations.setdefault(node, []).append(time.perf_counter() - t0)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._close(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._close(run_id)
+
+    def summary(self) -> dict:
+        return {
+            node: _distribution(values) | {"total_sec": round(sum(values), 4)}
+            for node, values in sorted(self.durations.items())
+        }
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _distribution(values: list) -> dict:
+    return {
+        "count": len(values),
+        "mean_sec": round(statistics.fmean(values), 4),
+        "p50_sec": round(_percentile(values, 50), 4),
+        "p95_sec": round(_percentile(values, 95), 4),
+    }
+
+
+def _json_default(value: Any):
+    if isinstance(value, BaseMessage):
+        return message_to_dict(value)
+    return str(value)
+
+
+def state_bytes(state: dict) -> dict:
+    """Serialized size of the final state, and of its message history."""
+    messages = state.get("researcher_messages", [])
+    return {
+        "messages": len(messages),
+        "message_state_bytes": len(json.dumps(messages, default=_json_default)),
+        "state_bytes": len(json.dumps(state, default=_json_default)),
+    }
+
+
+async def _run_graph(brief: str, run_id: str, callbacks: Optional[list] = None):
+    return await search_agent.researcher_agent.ainvoke(
+        search_agent.init_state(brief, run_id),
+        {"callbacks": callbacks or []},
+    )
+
+
+async def profile_single_run(brief: str) -> dict:
+    """Peak traced heap and state size of one run, measured in isolation."""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        state = await _run_graph(brief, "bench-profile")
+        duration = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "duration_sec": round(duration, 4),
+        "peak_traced_bytes": peak,
+        **state_bytes(state),
+    }
+
+
+async def measure_concurrency(
+    brief: str, concurrency: int, runs: int, timer: NodeTimer
+) -> dict:
+    """Run `runs` graph invocations with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await _run_graph(brief, f"bench-c{concurrency}-{i}", [timer])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "elapsed_sec": round(elapsed, 4),
+        "runs_per_sec": round(runs / elapsed, 3),
+        "run_latency": _distribution(latencies),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(config: BenchConfig, brief: str) -> dict:
+    search_client = install_fakes(config)
+    timer = NodeTimer()
+
+    # warm-up: first-use imports and client construction stay out of the numbers
+    await _run_graph(brief, "bench-warmup")
+    profile = await profile_single_run(brief)
+
+    levels = []
+    for concurrency in config.concurrency:
+        levels.append(
+            await measure_concurrency(brief, concurrency, config.runs_per_level, timer)
+        )
+
+    return {
+        "benchmark": "research_graph",
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": asdict(config),
+        "single_run": profile,
+        "concurrency_levels": levels,
+        "node_wall_time": timer.summary(),
+        "search_calls": search_client.calls,
+        "hedged_search": research_tools.hedge_stats.snapshot(),
+        "providers": resilience.resilience_stats(),
+        # ru_maxrss is reported in KB on Linux
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--runs-per-level", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--ddg-latency", type=float, default=0.1)
+    parser.add_argument("--search-loops", type=int, default=2)
+    parser.add_argument("--reply-words", type=int, default=200)
+    parser.add_argument("--payload", default="response.json")
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    parser.add_argument("--warm-cache", action="store_true")
+    parser.add_argument("--rate-limits", action="store_true")
+    parser.add_argument("--brief", default="Benchmark research brief: what is the sky?")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    config = BenchConfig(
+        concurrency=args.concurrency,
+        runs_per_level=args.runs_per_level,
+        llm_latency_sec=args.llm_latency,
+        search_latency_sec=args.search_latency,
+        ddg_latency_sec=args.ddg_latency,
+        search_loops=args.search_loops,
+        reply_words=args.reply_words,
+        payload_path=args.payload,
+        payload_scale=args.payload_scale,
+        warm_cache=args.warm_cache,
+        rate_limits=args.rate_limits,
+    )
+
+    # a console metrics sink (RESEARCH_METRICS_SINKS=console) prints every
+    # run log; keep that out of the results
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        results = asyncio.run(run_benchmark(config, args.brief))
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
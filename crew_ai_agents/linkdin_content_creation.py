@@ -4,6 +4,7 @@ import yaml
 from crewai import LLM
 from pydantic import BaseModel
 from typing import Optional
+from functools import lru_cache
 from crewai import Agent, Task
 from firecrawl import FirecrawlApp
 from pydantic import BaseModel
@@ -13,14 +14,20 @@ from crewai_tools import DirectoryReadTool, FileReadTool
 from crewai.flow.flow import Flow, listen, or_, start, and_,router
 from firecrawl import Firecrawl
 from dotenv import load_dotenv
+# run from the repository root: python -m crew_ai_agents.linkdin_content_creation
+from utils.resilience import get_guard
 
 load_dotenv()
 
-os.environ["GOOGLE_API_KEY"] = os.getenv("GEMINI_API_KEY")
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+# only mirror keys that are set, so importing never fails without them
+if os.getenv("GEMINI_API_KEY"):
+    os.environ["GOOGLE_API_KEY"] = os.getenv("GEMINI_API_KEY")
 
 
-llm = LLM(model="gpt-4o-mini")
+@lru_cache(maxsize=None)
+def get_llm() -> LLM:
+    return LLM(model="gpt-4o-mini")
+
 # from google import genai
 # from google.genai import Client
 
@@ -63,22 +70,31 @@ class ContentPlanningState(BaseModel):
 
 
 #--------------- DEFINE CREW AGENT AND TASK ------------------
+# Built on first use rather than at import, so the module can be imported
+# (by a server, tests, ...) without API keys or client construction.
+
+@lru_cache(maxsize=None)
+def get_draft_analyzer() -> tuple[Agent, Task]:
+    draft_analyzer = Agent(config=agents_config['draft_analyzer'],
+                        tools=all_tools,
+                        llm=get_llm())
 
-draft_analyzer = Agent(config=agents_config['draft_analyzer'],
-                    tools=all_tools,
-                    llm=llm)
+    analyze_draft = Task(config=tasks_config['analyze_draft'],
+                        agent=draft_analyzer
+                        )
+    return draft_analyzer, analyze_draft
 
-analyze_draft = Task(config=tasks_config['analyze_draft'],
-                    agent=draft_analyzer
-                    )
 
-linkedin_post_planner = Agent(config=agents_config['linkedin_post_planner'],
-                            tools=all_tools,
-                            llm=llm)
+@lru_cache(maxsize=None)
+def get_linkedin_post_planner() -> tuple[Agent, Task]:
+    linkedin_post_planner = Agent(config=agents_config['linkedin_post_planner'],
+                                tools=all_tools,
+                                llm=get_llm())
 
-create_linkedin_post_plan = Task(config=tasks_config['create_linkedin_post_plan'],
-                                agent=linkedin_post_planner,
-                                output_pydantic=LinkedInPost)
+    create_linkedin_post_plan = Task(config=tasks_config['create_linkedin_post_plan'],
+                                    agent=linkedin_post_planner,
+                                    output_pydantic=LinkedInPost)
+    return linkedin_post_planner, create_linkedin_post_plan
 
 
 
@@ -94,7 +110,9 @@ class ContentPlanning(Flow[ContentPlanningState]):
         app = FirecrawlApp(api_key = os.getenv("FIRECRAWL_API_KEY"))
         Firecrawl
         # scrape_results = app.crawl_url(self.state.blog_post_url, params = {'format':['html','markdown']})
-        scrape_results = app.scrape(
+        # rate limited, retried on 429/5xx, fails fast while Firecrawl is down
+        scrape_results = get_guard("firecrawl").call(
+            app.scrape,
             self.state.blog_post_url,
             formats=["markdown", "html"])
         #try and except blocks because calling an api that can fail
@@ -126,6 +144,7 @@ class ContentPlanning(Flow[ContentPlanningState]):
     @listen("linkedin")
     def linkedin_draft(self):
         print(f"# Planning content for: {self.state.draft_path}")
+        linkedin_post_planner, create_linkedin_post_plan = get_linkedin_post_planner()
         linkedin_planning_crew = Crew(agents=[linkedin_post_planner],
         tasks=[create_linkedin_post_plan], process = Process.sequential) 
         
@@ -142,8 +161,9 @@ class ContentPlanning(Flow[ContentPlanningState]):
 
 
 
-# Initialize the flow with all required fields
-flow = ContentPlanning()
+if __name__ == "__main__":
+    # Initialize the flow with all required fields
+    flow = ContentPlanning()
 
-# Manually create StateWithId with required fields
-flow.kickoff()
+    # Manually create StateWithId with required fields
+    flow.kickoff()
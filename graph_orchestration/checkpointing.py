@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+# -------------------------
+# CHECKPOINT STORE
+# -------------------------
+
+CHECKPOINT_DB_PATH = os.getenv(
+    "RESEARCH_CHECKPOINT_DB", os.path.join(".cache", "checkpoints.sqlite3")
+)
+# checkpoints of runs untouched for this long are garbage-collected
+CHECKPOINT_MAX_AGE_SEC = 7 * 24 * 3600
+
+
+def run_config(run_id: str) -> dict:
+    """Graph config that keys checkpoints by run_id."""
+    return {"configurable": {"thread_id": run_id}}
+
+
+def open_checkpointer(path: str = CHECKPOINT_DB_PATH) -> SqliteSaver:
+    """Open a SQLite checkpointer shared by every thread of this process."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = SqliteSaver(conn)
+    saver.setup()
+    return saver
+
+
+@asynccontextmanager
+async def open_async_checkpointer(path: str = CHECKPOINT_DB_PATH):
+    """Async SQLite checkpointer for ainvoke/astream runs."""
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        await saver.setup()
+        yield saver
+
+
+# -------------------------
+# COMPACTION / GC
+# -------------------------
+
+
+def _checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time encoded in a LangGraph checkpoint id (a UUIDv6)."""
+    top = uuid.UUID(checkpoint_id).int >> 64
+    ticks = ((top >> 32) << 28) | (((top >> 16) & 0xFFFF) << 12) | (top & 0x0FFF)
+    # UUID time is 100ns ticks since 1582-10-15
+    return (ticks - 0x01B21DD213814000) / 1e7
+
+
+def compact_checkpoints(saver: SqliteSaver) -> int:
+    """Keep only the latest checkpoint (and its pending writes) of every run.
+
+    Each checkpoint stores the full channel values, so the latest one is
+    enough to resume a run; older ones only serve history/time travel.
+    Returns the number of checkpoints deleted.
+    """
+    with saver.cursor() as cur:
+        latest = """
+            SELECT thread_id, checkpoint_ns, MAX(checkpoint_id)
+            FROM checkpoints GROUP BY thread_id, checkpoint_ns
+        """
+        cur.execute(
+            f"""DELETE FROM writes WHERE (thread_id, checkpoint_ns, checkpoint_id)
+            NOT IN ({latest})"""
+        )
+        cur.execute(
+            f"""DELETE FROM checkpoints WHERE (thread_id, checkpoint_ns, checkpoint_id)
+            NOT IN ({latest})"""
+        )
+        deleted = cur.rowcount
+    with saver.lock:
+        saver.conn.execute("VACUUM")
+    return deleted
+
+
+def gc_checkpoints(
+    saver: SqliteSaver, max_age_sec: float = CHECKPOINT_MAX_AGE_SEC
+) -> list[str]:
+    """Delete every run whose newest checkpoint is older than max_age_sec.
+
+    Returns the deleted run_ids.
+    """
+    cutoff = time.time() - max_age_sec
+    with saver.cursor(transaction=False) as cur:
+        cur.execute(
+            "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+        )
+        stale = [
+            thread_id
+            for thread_id, checkpoint_id in cur.fetchall()
+            if _checkpoint_time(checkpoint_id) < cutoff
+        ]
+
+    for thread_id in stale:
+        saver.delete_thread(thread_id)
+    return stale
+
+
+def maintain_checkpoints(
+    path: str = CHECKPOINT_DB_PATH, max_age_sec: float = CHECKPOINT_MAX_AGE_SEC
+) -> dict:
+    """Garbage-collect stale runs, then compact the rest, in the store at path.
+
+    Opens its own synchronous connection, so it also maintains stores
+    written through open_async_checkpointer; run it when no run is
+    writing, e.g. after a batch.
+    """
+    saver = open_checkpointer(path)
+    try:
+        removed_runs = gc_checkpoints(saver, max_age_sec)
+        return {
+            "removed_runs": len(removed_runs),
+            "compacted_checkpoints": compact_checkpoints(saver),
+        }
+    finally:
+        saver.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Garbage-collect and compact the research checkpoint store."
+    )
+    parser.add_argument("--path", default=CHECKPOINT_DB_PATH)
+    parser.add_argument(
+        "--max-age-sec",
+        type=float,
+        default=CHECKPOINT_MAX_AGE_SEC,
+        help="delete runs whose newest checkpoint is older than this",
+    )
+    args = parser.parse_args()
+    print(json.dumps(maintain_checkpoints(args.path, args.max_age_sec)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict, Annotated, List, Sequence
 from typing import TypedDict, List, Dict, Any, Literal
+from utils.token_usage import merge_token_metrics
+from utils.tool_metrics import merge_tool_metrics
 
 
 class ResearcherState(TypedDict):
@@ -19,12 +21,36 @@ class ResearcherState(TypedDict):
     research_topic: str
     compressed_research: str
     raw_notes: Annotated[List[str], operator.add]
+    # incremental compression: notes folded so far and how many
+    # researcher_messages they cover
+    running_notes: str
+    folded_messages: int
 
-    tool_metrics: Dict[str, Any]
-    token_metrics: Dict[str, int]
+    # bounded counters/histograms; tool_node returns each round's metrics
+    # and merge_tool_metrics folds them in (utils.tool_metrics)
+    tool_metrics: Annotated[Dict[str, Any], merge_tool_metrics]
+    # canonical URLs + content fingerprints seen this run (utils.dedup)
+    seen_sources: Dict[str, Any]
+    # one entry per tool_node round that returned sources: how many were
+    # new vs. duplicates of seen_sources (drives adaptive stopping)
+    novelty_history: Annotated[List[Dict[str, Any]], operator.add]
+    # why the research loop ended, recorded by compress_research
+    stop_reason: Dict[str, Any]
+    # False for sub-researchers whose findings go to a supervisor's report
+    write_report: bool
+    final_report: str
+    # ttft_sec / generation_sec / chunks of the streamed final report
+    report_timing: Dict[str, Any]
+    # model calls return their own tokens and cost; merge_token_metrics
+    # adds them up (utils.token_usage)
+    token_metrics: Annotated[Dict[str, Any], merge_token_metrics]
+    # research_agent_prompt rendered once per run (see utils.prompt_assembly)
+    system_prompt: str
     loop_count: int
     run_id: str
     start_time: float
+    # metrics summary written by finalize_run_log
+    run_log: Dict[str, Any]
 
 
 class ResearcherOutputState(TypedDict):
@@ -36,5 +62,51 @@ class ResearcherOutputState(TypedDict):
     """
 
     compressed_research: str
+    final_report: str
     raw_notes: Annotated[List[str], operator.add]
     researcher_messages: Annotated[Sequence[BaseMessage], add_messages]
+    run_log: Dict[str, Any]
+
+
+class SupervisorState(TypedDict):
+    """
+    State for the supervisor that splits a research brief into subtopics.
+
+    Each ConductResearch call runs a researcher_agent subgraph in parallel
+    (see agents.supervisor_agent); their compressed findings accumulate in
+    notes and are merged into final_report.
+    """
+
+    supervisor_messages: Annotated[Sequence[BaseMessage], add_messages]
+    research_brief: str
+    # lead_researcher_prompt rendered once per run
+    system_prompt: str
+    research_iterations: int
+    notes: Annotated[List[str], operator.add]
+    raw_notes: Annotated[List[str], operator.add]
+    # run log of every finished sub-researcher
+    sub_runs: Annotated[List[Dict[str, Any]], operator.add]
+    final_report: str
+    report_timing: Dict[str, Any]
+    # supervisor and report calls; sub-runs keep their own
+    token_metrics: Annotated[Dict[str, Any], merge_token_metrics]
+    run_id: str
+    start_time: float
+    run_log: Dict[str, Any]
+
+
+class ResearchTask(TypedDict):
+    """Input sent to one sub-researcher for a ConductResearch call."""
+
+    research_topic: str
+    tool_call_id: str
+    run_id: str
+
+
+class SupervisorOutputState(TypedDict):
+    """Final report of a supervised run plus the findings it was built from."""
+
+    final_report: str
+    notes: Annotated[List[str], operator.add]
+    raw_notes: Annotated[List[str], operator.add]
+    run_log: Dict[str, Any]
@@ -0,0 +1,256 @@
+"""HTTP service for the researcher graph.
+
+Run with:
+    uvicorn service.app:app --host 0.0.0.0 --port 8000
+
+POST /research streams Server-Sent Events while the run progresses:
+`queued`, `started`, one `node` event per finished graph node,
+`result` (compressed research), `token` events carrying the final report
+as it is generated, then `report` (the full report) and `metrics` (the
+run log), or `error`.
+GET /metrics serves Prometheus metrics when that sink is enabled.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from agents.search_agent import init_state, researcher_agent
+from utils.http_pool import http_pool_stats
+from utils.resilience import resilience_stats
+from utils.telemetry import render_prometheus
+
+
+# -------------------------
+# ADMISSION CONTROL
+# -------------------------
+
+MAX_CONCURRENT_RUNS = int(os.getenv("RESEARCH_MAX_CONCURRENT_RUNS", "16"))
+MAX_QUEUED_RUNS = int(os.getenv("RESEARCH_MAX_QUEUED_RUNS", "64"))
+RETRY_AFTER_SEC = 10
+RUN_HISTORY_SIZE = 1000
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded wait queue.
+
+    At most `max_concurrent` runs execute at once; up to `max_queued` more
+    wait for a slot. Anything beyond that is rejected up front so the
+    caller can back off (HTTP 429) instead of piling onto the event loop.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.active = 0
+        self.queued = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def try_reserve(self) -> bool:
+        """Reserve a queue position; False when the service is saturated."""
+        if self.active + self.queued >= self.max_concurrent + self.max_queued:
+            return False
+        self.queued += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a reserved position that never waited for a slot."""
+        self.queued -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for an execution slot for a previously reserved position."""
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+        }
+
+
+admission = AdmissionController(MAX_CONCURRENT_RUNS, MAX_QUEUED_RUNS)
+
+# run_id -> status/timing/run_log, oldest evicted first
+runs: OrderedDict = OrderedDict()
+
+
+def _track_run(run_id: str, **fields) -> dict:
+    record = runs.setdefault(run_id, {"run_id": run_id})
+    record.update(fields)
+    runs.move_to_end(run_id)
+    while len(runs) > RUN_HISTORY_SIZE:
+        runs.popitem(last=False)
+    return record
+
+
+# -------------------------
+# STREAMING
+# -------------------------
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _node_summary(node: str, update: Optional[dict]) -> dict:
+    """Small, JSON-friendly description of a node update for progress events."""
+    summary = {"node": node}
+    messages = (update or {}).get("researcher_messages") or []
+
+    if node == "llm_call" and messages:
+        summary["tool_calls"] = [tc["name"] for tc in messages[-1].tool_calls]
+    elif node == "tool_node":
+        summary["tool_results"] = [m.name for m in messages]
+    return summary
+
+
+async def _research_events(brief: str, run_id: str):
+    """SSE events of one researcher_agent run, as its graph streams."""
+    async for mode, chunk in researcher_agent.astream(
+        init_state(brief, run_id), stream_mode=["updates", "messages"]
+    ):
+        if mode == "messages":
+            message, metadata = chunk
+            if (
+                metadata.get("langgraph_node") == "final_report_generation"
+                and message.content
+            ):
+                yield _sse("token", {"run_id": run_id, "content": message.content})
+            continue
+
+        for node, update in chunk.items():
+            yield _sse("node", _node_summary(node, update))
+
+            if node == "compress_research":
+                yield _sse(
+                    "result",
+                    {
+                        "run_id": run_id,
+                        "compressed_research": update["compressed_research"],
+                    },
+                )
+            elif node == "final_report_generation":
+                yield _sse(
+                    "report",
+                    {"run_id": run_id, "final_report": update["final_report"]},
+                )
+            elif node == "finalize_run_log":
+                _track_run(run_id, run_log=update["run_log"])
+                yield _sse("metrics", update["run_log"])
+
+
+async def _stream_run(brief: str, run_id: str):
+    queued_at = time.time()
+    _track_run(run_id, status="queued", queued_at=queued_at)
+    # the endpoint reserved a queue position; slot() takes it over once entered
+    reserved = True
+    try:
+        yield _sse("queued", {"run_id": run_id, **admission.stats()})
+        reserved = False
+
+        async with admission.slot():
+            started_at = time.time()
+            _track_run(
+                run_id,
+                status="running",
+                started_at=started_at,
+                queue_wait_sec=round(started_at - queued_at, 3),
+            )
+            yield _sse("started", {"run_id": run_id})
+
+            try:
+                async for event in _research_events(brief, run_id):
+                    yield event
+            except Exception as e:
+                _track_run(
+                    run_id, status="failed", error=str(e), finished_at=time.time()
+                )
+                yield _sse("error", {"run_id": run_id, "error": str(e)})
+                return
+
+            _track_run(run_id, status="completed", finished_at=time.time())
+    finally:
+        # the client disconnected while queued or running
+        if reserved:
+            admission.release()
+        if runs.get(run_id, {}).get("status") in ("queued", "running"):
+            _track_run(run_id, status="cancelled", finished_at=time.time())
+
+
+# -------------------------
+# APP
+# -------------------------
+
+app = FastAPI(title="Deep research service")
+
+
+class ResearchRequest(BaseModel):
+    brief: str = Field(description="Research brief for the researcher agent")
+    run_id: Optional[str] = Field(
+        default=None, description="Optional caller-chosen run id"
+    )
+
+
+@app.post("/research")
+async def research(request: ResearchRequest):
+    if not admission.try_reserve():
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Research service is at capacity, retry later."},
+            headers={"Retry-After": str(RETRY_AFTER_SEC)},
+        )
+
+    run_id = request.run_id or str(uuid.uuid4())
+    return StreamingResponse(
+        _stream_run(request.brief, run_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Run-Id": run_id},
+    )
+
+
+@app.get("/runs/{run_id}/metrics")
+async def run_metrics(run_id: str):
+    if run_id not in runs:
+        raise HTTPException(status_code=404, detail="Unknown run_id")
+    return runs[run_id]
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (RESEARCH_METRICS_SINKS must include prometheus)."""
+    text = render_prometheus()
+    if text is None:
+        raise HTTPException(status_code=404, detail="Prometheus sink not enabled")
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        **admission.stats(),
+        "providers": resilience_stats(),
+        "http_pools": http_pool_stats(),
+    }
@@ -1,15 +1,173 @@
 # import packages
 from langchain_core.tools import tool
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_tavily import TavilySearch
 from dotenv import load_dotenv
+import contextvars
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.cache import SQLiteCache, make_cache_key
+from utils.call_stats import record_call_stat
+from utils.message_formatting import format_search_output, process_search_results
+from utils.result_packing import pack_search_results, rank_sources
+from utils.dedup import canonicalize_url, dedupe_search_results, register_sources
+from utils.http_pool import MAX_CONCURRENT_RUNS
+from utils.model_registry import get_or_create
+from utils.cassette import get_cassette
+from utils.resilience import get_guard
 
 load_dotenv()
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 # os.environ["TAVILY_API_KEY"] = TAVILY_API_KEY
 
 
+# -------------------------
+# SEARCH RESULT CACHE
+# -------------------------
+
+# seconds a cached result stays fresh, per provider
+SEARCH_CACHE_TTL_SEC = {
+    "tavily": 24 * 3600,
+    "duckduckgo": 6 * 3600,
+}
+SEARCH_CACHE_MAX_ENTRIES = 5000
+# force fresh searches for every call, e.g. SEARCH_CACHE_BYPASS=1
+SEARCH_CACHE_BYPASS = os.getenv("SEARCH_CACHE_BYPASS", "0") == "1"
+
+search_cache = SQLiteCache("search_results", max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return " ".join(query.lower().split())
+
+
+def is_cacheable(provider: str, result) -> bool:
+    """Whether a search result is worth caching: errors and empty answers are not."""
+    if provider == "tavily":
+        # anything but a results dict is an error message from the tool
+        return (
+            isinstance(result, dict)
+            and "error" not in result
+            and bool(result.get("results"))
+        )
+    if isinstance(result, dict):
+        return "error" not in result
+    return bool(result)
+
+
+def cached_search(provider: str, query: str, params: dict, search_fn, fresh=False):
+    """Return a cached search result or call search_fn and cache its result.
+
+    Only results passing is_cacheable are stored, so a failed search is
+    retried on the next call instead of being served until it expires.
+
+    Args:
+        provider: Provider name, selects the TTL in SEARCH_CACHE_TTL_SEC.
+        query: Raw query string; normalized before keying.
+        params: Provider parameters that change the result (part of the key).
+        search_fn: Zero-argument callable that performs the real search.
+        fresh: Skip the lookup (the fresh result is still stored).
+
+    Returns:
+        The provider result, from cache or freshly fetched.
+    """
+    key = make_cache_key(provider, normalize_query(query), params)
+
+    if not (fresh or SEARCH_CACHE_BYPASS):
+        cached = search_cache.get(key, ttl=SEARCH_CACHE_TTL_SEC.get(provider))
+        if cached is not None:
+            record_call_stat(f"cache_{provider}", "hit")
+            return cached
+
+    # record/replay sits beneath the cache; the provider guard (rate limit,
+    # retry, circuit breaker) only wraps calls that really hit the network
+    result = get_cassette().call(
+        provider,
+        {"query": normalize_query(query), "params": params},
+        lambda: get_guard(provider).call(search_fn),
+    )
+    if is_cacheable(provider, result):
+        search_cache.set(key, result)
+    # keyed per provider: a hedged search looks up both providers' entries
+    record_call_stat(
+        f"cache_{provider}", "bypass" if fresh or SEARCH_CACHE_BYPASS else "miss"
+    )
+    return result
+
+
+# -------------------------
+# SEARCH CLIENTS
+# -------------------------
+
+
+def invoke_tavily(client, query: str):
+    """Invoke a TavilySearch tool, raising the errors it returns as results.
+
+    TavilySearch catches request errors and returns {"error": exc}; raised
+    instead, they reach the provider guard, which retries rate limits and
+    outages and counts them towards the circuit breaker.
+    """
+    result = client.invoke(query)
+    error = result.get("error") if isinstance(result, dict) else None
+    if isinstance(error, Exception):
+        raise error
+    if error is not None:
+        raise RuntimeError(f"Tavily search failed: {error}")
+    return result
+
+# Provider SDKs are imported and clients built on first use, then shared
+# by every later call with the same parameters. All of them send their
+# requests over the keep-alive connections of tools.search_clients.
+
+
+def get_duckduckgo_client():
+    def build():
+        from langchain_community.tools import DuckDuckGoSearchRun
+        from tools.search_clients import PooledDuckDuckGoAPIWrapper
+
+        return DuckDuckGoSearchRun(api_wrapper=PooledDuckDuckGoAPIWrapper())
+
+    return get_or_create(("search", "duckduckgo"), build)
+
+
+def get_duckduckgo_results_client(max_results: int):
+    """DuckDuckGo client returning a list of {title, link, snippet} dicts."""
+
+    def build():
+        from langchain_community.tools import DuckDuckGoSearchResults
+        from tools.search_clients import PooledDuckDuckGoAPIWrapper
+
+        return DuckDuckGoSearchResults(
+            api_wrapper=PooledDuckDuckGoAPIWrapper(),
+            # the field is aliased; max_results= would be silently ignored
+            num_results=max_results,
+            output_format="list",
+        )
+
+    return get_or_create(("search", "duckduckgo_results", max_results), build)
+
+
+def get_tavily_client(
+    max_results: int, include_raw_content: bool, include_links: bool
+):
+    def build():
+        from langchain_tavily import TavilySearch
+        from tools.search_clients import PooledTavilyAPIWrapper
+
+        return TavilySearch(
+            api_wrapper=PooledTavilyAPIWrapper(),
+            max_results=max_results,
+            include_raw_content=include_raw_content,
+            include_links=include_links,
+        )
+
+    return get_or_create(
+        ("search", "tavily", max_results, include_raw_content, include_links), build
+    )
+
+
 # Tool A: DuckDuckGo
 
 
@@ -27,7 +185,9 @@ def duckduckgo_search_tool(query: str) -> str:
     Returns:
         A text-based summary of the DuckDuckGo search results.
     """
-    return DuckDuckGoSearchRun().run(query)
+    return cached_search(
+        "duckduckgo", query, {}, lambda: get_duckduckgo_client().run(query)
+    )
 
 
 # Tool B: Tavily
@@ -53,17 +213,359 @@ def tavily_search_tool(
     Returns:
         A formatted and summarized string of high-quality search results.
     """
-    search_results = TavilySearch(
-        max_results=max_results,
-        include_raw_content=include_raw_content,
-        include_links=include_links,
-    ).invoke(query)
-
-    # summarized_results = process_search_results(search_results)
-    # print(summarized_results)
-    # return format_search_output(summarized_results)
-    print(search_results)
-    return search_results
+    search_results = cached_search(
+        "tavily",
+        query,
+        {
+            "max_results": max_results,
+            "include_raw_content": include_raw_content,
+            "include_links": include_links,
+        },
+        lambda: invoke_tavily(
+            get_tavily_client(max_results, include_raw_content, include_links), query
+        ),
+    )
+
+    return _dedupe_and_pack(search_results)
+
+
+# summarize every new page with the summarization model instead of packing
+# the raw results: one batched model call per search, summaries cached by
+# page content, e.g. SEARCH_SUMMARIZE_RESULTS=1
+SUMMARIZE_SEARCH_RESULTS = os.getenv("SEARCH_SUMMARIZE_RESULTS", "0") == "1"
+
+
+def _dedupe_and_pack(search_results) -> str:
+    # the raw response (full raw_content of every page) would otherwise be
+    # carried in researcher_messages and re-sent on every llm_call
+    if not isinstance(search_results, dict):
+        packed, packing_stats = pack_search_results(search_results)
+        record_call_stat("tokens_saved", packing_stats["saved_tokens"])
+        record_call_stat("packing", packing_stats)
+        return packed
+
+    # only sources the model actually receives are marked as seen; one
+    # packed away over budget can still come back in a later search
+    search_results, removed = dedupe_search_results(search_results, register=False)
+    record_call_stat("duplicates_removed", sum(removed.values()))
+    if not search_results["results"] and any(removed.values()):
+        return "All results for this query duplicate sources already retrieved in this research run. Try a different angle or query."
+
+    if SUMMARIZE_SEARCH_RESULTS:
+        summarized = process_search_results(search_results, dedupe=False)
+        register_sources(
+            [r for r in search_results["results"] if r.get("url") in summarized]
+        )
+        return format_search_output(summarized)
+
+    packed, packing_stats = pack_search_results(search_results)
+    record_call_stat("tokens_saved", packing_stats["saved_tokens"])
+    record_call_stat("packing", packing_stats)
+    register_sources(
+        rank_sources(search_results["results"])[: packing_stats["sources_kept"]]
+    )
+    return packed
+
+
+# -------------------------
+# HEDGED SEARCH
+# -------------------------
+
+# Tavily and DuckDuckGo are queried at the same time. The tool returns as
+# soon as the merged results are good enough or the deadline passes, so a
+# slow Tavily call no longer stalls the research loop. Calls that miss the
+# deadline keep running in the background and still fill the search cache.
+HEDGE_DEADLINE_SEC = float(os.getenv("SEARCH_HEDGE_DEADLINE_SEC", "8"))
+HEDGE_MAX_RESULTS = 10
+# quality needed to return before the deadline: a result with page content
+# counts 1, a snippet-only result (DuckDuckGo) counts SNIPPET_QUALITY
+HEDGE_QUALITY_TARGET = 4.0
+SNIPPET_QUALITY = 0.25
+RICH_CONTENT_CHARS = 500
+# preferred first when both providers return the same URL
+HEDGE_PROVIDERS = ("tavily", "duckduckgo")
+# hard cap on one hedged search, queueing included; stays under the
+# agent's 60 s TOOL_TIMEOUT_SEC so the tool can still answer in time
+HEDGE_TIMEOUT_SEC = float(os.getenv("SEARCH_HEDGE_TIMEOUT_SEC", "50"))
+# every concurrent run can have one call per provider in flight
+HEDGE_MAX_WORKERS = MAX_CONCURRENT_RUNS * len(HEDGE_PROVIDERS)
+
+
+def _tavily_results(query: str, max_results: int) -> list:
+    response = cached_search(
+        "tavily",
+        query,
+        {
+            "max_results": max_results,
+            "include_raw_content": True,
+            "include_links": True,
+        },
+        lambda: invoke_tavily(get_tavily_client(max_results, True, True), query),
+    )
+    return response.get("results", []) if isinstance(response, dict) else []
+
+
+def _duckduckgo_results(query: str, max_results: int) -> list:
+    results = cached_search(
+        "duckduckgo",
+        query,
+        {"output_format": "list", "max_results": max_results},
+        lambda: get_duckduckgo_results_client(max_results).invoke(query),
+    )
+    # Tavily-shaped, so dedup and packing treat both providers alike
+    return [
+        {
+            "url": r["link"],
+            "title": r.get("title", ""),
+            "content": r.get("snippet", ""),
+            "raw_content": None,
+            "score": None,
+        }
+        for r in results or []
+        if isinstance(r, dict) and r.get("link")
+    ]
+
+
+_provider_search = {"tavily": _tavily_results, "duckduckgo": _duckduckgo_results}
+
+
+def merge_provider_results(arrived: dict) -> list:
+    """Merge per-provider result lists, keeping one result per canonical URL."""
+    merged = {}
+    for provider in HEDGE_PROVIDERS:
+        for result in arrived.get(provider) or []:
+            key = canonicalize_url(result.get("url", ""))
+            if key and key not in merged:
+                merged[key] = {**result, "provider": provider}
+    return list(merged.values())
+
+
+def result_quality(results: list) -> float:
+    return sum(
+        (
+            1.0
+            if len(result.get("raw_content") or result.get("content") or "")
+            >= RICH_CONTENT_CHARS
+            else SNIPPET_QUALITY
+        )
+        for result in results
+    )
+
+
+class HedgeStats:
+    """Process-wide provider latencies and win rates, for tuning deadlines.
+
+    A provider "wins" a hedged call when its results were in hand when the
+    tool returned; "first" counts which provider answered first.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._providers: dict = {}
+        self.outcomes: dict = {}
+
+    def _provider(self, provider: str) -> dict:
+        return self._providers.setdefault(
+            provider,
+            {
+                "calls": 0,
+                "failures": 0,
+                "wins": 0,
+                "first": 0,
+                "latencies": deque(maxlen=self.window),
+            },
+        )
+
+    def record_latency(self, provider: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._provider(provider)
+            stats["calls"] += 1
+            stats["latencies"].append(latency)
+            if not ok:
+                stats["failures"] += 1
+
+    def record_outcome(self, reason: str, winners: list, first) -> None:
+        with self._lock:
+            self.outcomes[reason] = self.outcomes.get(reason, 0) + 1
+            for provider in winners:
+                self._provider(provider)["wins"] += 1
+            if first:
+                self._provider(first)["first"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hedged_calls = sum(self.outcomes.values())
+            providers = {}
+            for provider, stats in self._providers.items():
+                latencies = sorted(stats["latencies"])
+                providers[provider] = {
+                    "calls": stats["calls"],
+                    "failures": stats["failures"],
+                    "wins": stats["wins"],
+                    "first": stats["first"],
+                    "win_rate": (
+                        round(stats["wins"] / hedged_calls, 3) if hedged_calls else 0.0
+                    ),
+                    "latency_p50_sec": _percentile(latencies, 0.50),
+                    "latency_p95_sec": _percentile(latencies, 0.95),
+                }
+            return {
+                "calls": hedged_calls,
+                "outcomes": dict(self.outcomes),
+                "providers": providers,
+            }
+
+
+def _percentile(ordered: list, q: float):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+hedge_stats = HedgeStats()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    return get_or_create(
+        ("executor", "hedged_search"),
+        lambda: ThreadPoolExecutor(
+            max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedged_search"
+        ),
+    )
+
+
+def _provider_call(provider: str, query: str, max_results: int, on_start=None):
+    started = time.perf_counter()
+    if on_start is not None:
+        on_start(started)
+    ok = False
+    try:
+        results = _provider_search[provider](query, max_results)
+        ok = True
+        return results
+    finally:
+        # recorded even when the call finishes after the tool returned
+        hedge_stats.record_latency(provider, time.perf_counter() - started, ok)
+
+
+def hedged_search(
+    query: str,
+    max_results: int = HEDGE_MAX_RESULTS,
+    deadline_sec: float = HEDGE_DEADLINE_SEC,
+) -> tuple[dict, dict]:
+    """Query every provider at once and return early when results suffice.
+
+    Returns as soon as the merged results reach HEDGE_QUALITY_TARGET, or
+    at the deadline with whatever has arrived. If nothing usable arrived
+    by then, it keeps waiting for the first provider that answers. The
+    deadline runs from the first provider call actually starting, so time
+    spent queued for an executor thread does not use it up. Nothing waits
+    past HEDGE_TIMEOUT_SEC from the call.
+
+    Returns:
+        Tuple of (Tavily-style response with merged results, hedge info:
+        reason, providers used, elapsed seconds, and provider errors if
+        any failed).
+    """
+    executor = get_hedge_executor()
+    called = time.perf_counter()
+    call_starts: list = []
+    first_call = threading.Event()
+
+    def on_start(started: float) -> None:
+        call_starts.append(started)
+        first_call.set()
+
+    futures = {
+        # copied context: cache stats land on this tool call
+        executor.submit(
+            contextvars.copy_context().run,
+            _provider_call,
+            provider,
+            query,
+            max_results,
+            on_start,
+        ): provider
+        for provider in HEDGE_PROVIDERS
+    }
+    pending = set(futures)
+    arrived: dict = {}
+    errors: dict = {}
+    first = None
+    reason = "all_done"
+
+    if first_call.wait(HEDGE_TIMEOUT_SEC):
+        started = min(call_starts)
+    else:
+        reason = "not_started"
+        pending = set()
+
+    while pending:
+        remaining = deadline_sec - (time.perf_counter() - started)
+        have_results = any(arrived.values())
+        if remaining <= 0 and have_results:
+            reason = "deadline"
+            break
+        left = HEDGE_TIMEOUT_SEC - (time.perf_counter() - called)
+        if left <= 0:
+            reason = "timeout"
+            break
+
+        done, pending = wait(
+            pending,
+            timeout=min(remaining, left) if remaining > 0 else left,
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            provider = futures[future]
+            try:
+                arrived[provider] = future.result()
+            except Exception as e:
+                errors[provider] = f"{type(e).__name__}: {e}"
+                arrived[provider] = []
+            first = first or provider
+
+        if (
+            pending
+            and result_quality(merge_provider_results(arrived)) >= HEDGE_QUALITY_TARGET
+        ):
+            reason = "quality"
+            break
+
+    winners = [provider for provider, results in arrived.items() if results]
+    hedge_stats.record_outcome(reason, winners, first)
+
+    results = merge_provider_results(arrived)[:max_results]
+    hedge = {
+        "reason": reason,
+        "providers": winners,
+        "elapsed_sec": round(time.perf_counter() - called, 3),
+    }
+    if errors:
+        hedge["errors"] = errors
+    return {"query": query, "results": results}, hedge
+
+
+@tool(parse_docstring=True)
+def hedged_search_tool(query: str) -> str:
+    """
+    Search the web with Tavily and DuckDuckGo at the same time.
+
+    Results from both providers are merged and deduplicated by URL. The
+    search returns as soon as enough good results are in, so one slow
+    provider does not hold up the research.
+
+    Args:
+        query: The search query string.
+
+    Returns:
+        A formatted string of the merged search results.
+    """
+    search_results, hedge = hedged_search(query)
+    record_call_stat("hedge", hedge)
+
+    return _dedupe_and_pack(search_results)
 
 
 # Tool C: Reflection / Thinking
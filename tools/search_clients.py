@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Optional
+
+import requests
+from ddgs import DDGS
+from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+from langchain_tavily._utilities import TAVILY_API_URL, TavilySearchAPIWrapper
+
+from utils.http_pool import HTTP_TIMEOUT_SEC, get_http_session
+from utils.model_registry import get_or_create
+
+
+# -------------------------
+# KEEP-ALIVE SEARCH WRAPPERS
+# -------------------------
+
+# The stock API wrappers open a fresh connection per search: Tavily's
+# posts through the module-level requests.post, DuckDuckGo's builds a new
+# DDGS (and HTTP client) for every query. These subclasses send the same
+# requests over clients that live for the whole process.
+
+
+class PooledTavilyAPIWrapper(TavilySearchAPIWrapper):
+    """Tavily API wrapper posting through the shared "tavily" session."""
+
+    def raw_results(self, query: str, **params: Any) -> Dict[str, Any]:
+        params = {k: v for k, v in params.items() if v is not None}
+        headers = {
+            "Authorization": f"Bearer {self.tavily_api_key.get_secret_value()}",
+            "Content-Type": "application/json",
+            "X-Client-Source": "langchain-tavily",
+        }
+        base_url = self.api_base_url or TAVILY_API_URL
+        response = get_http_session("tavily").post(
+            f"{base_url}/search",
+            json={"query": query, **params},
+            headers=headers,
+            timeout=HTTP_TIMEOUT_SEC,
+        )
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail", {})
+            except ValueError:
+                detail = {}
+            error_message = (
+                detail.get("error") if isinstance(detail, dict) else "Unknown error"
+            )
+            # carries the response, so the provider guard sees its status
+            # (and Retry-After) when deciding whether to retry
+            raise requests.HTTPError(
+                f"Error {response.status_code}: {error_message}", response=response
+            )
+        return response.json()
+
+
+def get_ddgs() -> DDGS:
+    """Process-wide DDGS; its engines keep their HTTP clients between queries."""
+    return get_or_create(("search", "ddgs"), DDGS)
+
+
+class PooledDuckDuckGoAPIWrapper(DuckDuckGoSearchAPIWrapper):
+    """DuckDuckGo API wrapper searching through the shared DDGS client."""
+
+    def _ddgs_text(
+        self, query: str, max_results: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        results = get_ddgs().text(
+            query,
+            region=self.region,
+            safesearch=self.safesearch,
+            timelimit=self.time,
+            max_results=max_results or self.max_results,
+            backend=self.backend,
+        )
+        return list(results or [])
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+# -------------------------
+# CACHE LOCATION
+# -------------------------
+
+CACHE_DIR = os.getenv("RESEARCH_CACHE_DIR", ".cache")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "research_cache.sqlite3")
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """Thread-safe key/value cache stored in a SQLite table.
+
+    Entries expire after a per-lookup TTL and the table is kept under
+    `max_entries` by evicting the least recently used rows. The database
+    is opened lazily on first use so importing a module that declares a
+    cache has no filesystem side effects.
+
+    Args:
+        table: Table name, one per kind of cached value.
+        max_entries: Upper bound on stored rows before LRU eviction.
+        path: SQLite file path, shared by all tables by default.
+    """
+
+    def __init__(
+        self, table: str, max_entries: int = 5000, path: str = CACHE_DB_PATH
+    ):
+        self.table = table
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_lru "
+                f"ON {self.table} (last_access)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Any:
+        """Return the cached value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None or (ttl is not None and now - row[1] > ttl):
+                self.misses += 1
+                return None
+
+            conn.execute(
+                f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+                (now, key),
+            )
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict LRU rows past the cap."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now, now),
+            )
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} "
+                    "ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.commit()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
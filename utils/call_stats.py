@@ -0,0 +1,39 @@
+from contextvars import ContextVar
+from typing import Any, Optional
+
+
+# Per-tool-call scratch dict. tool_node opens one around every tool
+# invocation so tools can report side-channel facts (cache hit, bytes
+# trimmed, ...) without changing the string they return to the model.
+# LangChain copies the current context into tool execution, so values
+# recorded inside worker threads and executors land in the same dict.
+_current_stats: ContextVar[Optional[dict]] = ContextVar(
+    "tool_call_stats", default=None
+)
+
+
+def record_call_stat(key: str, value: Any) -> None:
+    """Record a stat for the tool call currently executing (no-op outside one)."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats[key] = value
+
+
+def collect_call_stats(fn, *args, **kwargs) -> tuple[Any, dict]:
+    """Call fn and return (result, stats recorded during the call)."""
+    stats: dict = {}
+    token = _current_stats.set(stats)
+    try:
+        return fn(*args, **kwargs), stats
+    finally:
+        _current_stats.reset(token)
+
+
+async def acollect_call_stats(fn, *args, **kwargs) -> tuple[Any, dict]:
+    """Async counterpart of collect_call_stats for coroutine functions."""
+    stats: dict = {}
+    token = _current_stats.set(stats)
+    try:
+        return await fn(*args, **kwargs), stats
+    finally:
+        _current_stats.reset(token)
@@ -0,0 +1,269 @@
+"""Record/replay layer for chat model and search calls.
+
+Set RESEARCH_CASSETTE_MODE to:
+    off     - call providers directly (default)
+    record  - call providers and store every request/response pair
+    replay  - serve stored responses only; no network, no API keys
+
+Cassettes are plain JSON files under RESEARCH_CASSETTE_DIR, one per
+request, named by a hash of the normalized request. Replays can simulate
+provider latency with RESEARCH_CASSETTE_LATENCY ("recorded" to sleep for
+the recorded duration, a number of seconds, or 0). Prompts embed today's
+date, so record and replay with the same RESEARCH_FIXED_DATE to replay
+a cassette on another day.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+CASSETTE_MODE = os.getenv("RESEARCH_CASSETTE_MODE", "off")
+CASSETTE_DIR = os.getenv("RESEARCH_CASSETTE_DIR", "cassettes")
+CASSETTE_LATENCY = os.getenv("RESEARCH_CASSETTE_LATENCY", "0")
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when no recording matches a request."""
+
+
+class Cassette:
+    """Directory of recorded request/response pairs.
+
+    Args:
+        directory: Where recordings are stored.
+        mode: "off", "record" or "replay".
+        latency: Replay delay: "recorded", or seconds as a number/string.
+    """
+
+    def __init__(
+        self,
+        directory: str = CASSETTE_DIR,
+        mode: str = CASSETTE_MODE,
+        latency: Any = CASSETTE_LATENCY,
+    ):
+        if mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _path(self, kind: str, request: Any) -> str:
+        payload = json.dumps(request, sort_keys=True, default=str)
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, kind, f"{key}.json")
+
+    def _delay(self, recorded_sec: float) -> float:
+        if self.latency == "recorded":
+            return recorded_sec
+        return float(self.latency or 0)
+
+    def _load(self, kind: str, request: Any) -> dict:
+        path = self._path(kind, request)
+        if not os.path.exists(path):
+            self.stats["misses"] += 1
+            raise CassetteMiss(f"No {kind} recording for request ({path})")
+
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        self.stats["replayed"] += 1
+        return entry
+
+    def _save(self, kind: str, request: Any, response: Any, elapsed: float):
+        path = self._path(kind, request)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "kind": kind,
+                    "request": request,
+                    "response": response,
+                    "elapsed_sec": round(elapsed, 4),
+                },
+                f,
+                indent=2,
+                default=str,
+            )
+        os.replace(tmp_path, path)
+        self.stats["recorded"] += 1
+
+    def call(self, kind: str, request: Any, fn: Callable[[], Any]) -> Any:
+        """Serve `request` from the cassette or call fn (and maybe record).
+
+        fn's result must be JSON-serializable.
+        """
+        if self.mode == "replay":
+            entry = self._load(kind, request)
+            time.sleep(self._delay(entry["elapsed_sec"]))
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = fn()
+        if self.mode == "record":
+            self._save(kind, request, response, time.perf_counter() - start)
+        return response
+
+    async def acall(self, kind: str, request: Any, afn: Callable[[], Any]) -> Any:
+        """Async counterpart of call; afn returns an awaitable."""
+        if self.mode == "replay":
+            entry = self._load(kind, request)
+            await asyncio.sleep(self._delay(entry["elapsed_sec"]))
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = await afn()
+        if self.mode == "record":
+            self._save(kind, request, response, time.perf_counter() - start)
+        return response
+
+
+_default_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    """Process-wide cassette configured from the environment."""
+    global _default_cassette
+    if _default_cassette is None:
+        _default_cassette = Cassette()
+    return _default_cassette
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """Install a cassette (e.g. for a benchmark); None resets to the env."""
+    global _default_cassette
+    _default_cassette = cassette
+
+
+# -------------------------
+# CHAT MODELS
+# -------------------------
+
+
+def _message_key(message) -> dict:
+    # ids are assigned randomly per run (add_messages), so they are left out
+    # of the request key; everything the provider actually sees stays in
+    data = message_to_dict(message)["data"]
+    return {
+        "type": message.type,
+        "content": data.get("content"),
+        "name": data.get("name"),
+        "tool_calls": [
+            {"name": tc["name"], "args": tc["args"], "id": tc.get("id")}
+            for tc in data.get("tool_calls") or []
+        ],
+        "tool_call_id": data.get("tool_call_id"),
+    }
+
+
+def _result_to_json(result: ChatResult) -> dict:
+    return {
+        "generations": [
+            {
+                "message": message_to_dict(g.message),
+                "generation_info": g.generation_info,
+            }
+            for g in result.generations
+        ],
+        "llm_output": result.llm_output,
+    }
+
+
+def _result_from_json(data: dict) -> ChatResult:
+    return ChatResult(
+        generations=[
+            ChatGeneration(
+                message=messages_from_dict([g["message"]])[0],
+                generation_info=g.get("generation_info"),
+            )
+            for g in data["generations"]
+        ],
+        llm_output=data.get("llm_output"),
+    )
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model that records or replays another chat model's responses.
+
+    `inner` is the real model and may be None in replay mode. Tools bound
+    through bind_tools are formatted by `inner` when present; the cassette
+    key uses the tool names and tool_choice so record and replay match.
+    """
+
+    inner: Optional[BaseChatModel] = None
+    model_key: str
+    cassette: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _cassette(self) -> Cassette:
+        return self.cassette or get_cassette()
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        if self.inner is not None:
+            provider_kwargs = dict(
+                self.inner.bind_tools(tools, tool_choice=tool_choice, **kwargs).kwargs
+            )
+        else:
+            provider_kwargs = {"tools": [convert_to_openai_tool(t) for t in tools]}
+
+        return self.bind(
+            **provider_kwargs,
+            cassette_tools=[
+                convert_to_openai_tool(t)["function"]["name"] for t in tools
+            ],
+            cassette_tool_choice=tool_choice,
+        )
+
+    def _request(self, messages, stop, kwargs) -> tuple[dict, dict]:
+        provider_kwargs = {
+            k: v for k, v in kwargs.items() if not k.startswith("cassette_")
+        }
+        request = {
+            "model": self.model_key,
+            "messages": [_message_key(m) for m in messages],
+            "stop": stop,
+            "tools": kwargs.get("cassette_tools"),
+            "tool_choice": kwargs.get("cassette_tool_choice"),
+        }
+        return request, provider_kwargs
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        request, provider_kwargs = self._request(messages, stop, kwargs)
+
+        def call():
+            if self.inner is None:
+                raise CassetteMiss("No inner model to record from")
+            return _result_to_json(
+                self.inner._generate(messages, stop=stop, **provider_kwargs)
+            )
+
+        return _result_from_json(self._cassette().call("chat", request, call))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        request, provider_kwargs = self._request(messages, stop, kwargs)
+
+        async def call():
+            if self.inner is None:
+                raise CassetteMiss("No inner model to record from")
+            return _result_to_json(
+                await self.inner._agenerate(messages, stop=stop, **provider_kwargs)
+            )
+
+        return _result_from_json(await self._cassette().acall("chat", request, call))
@@ -0,0 +1,247 @@
+import hashlib
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+
+# -------------------------
+# URL CANONICALIZATION
+# -------------------------
+
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "igshid",
+    "ref",
+    "ref_src",
+    "spm",
+    "_ga",
+}
+TRACKING_PREFIXES = ("utm_",)
+HOST_PREFIXES = ("www.", "m.", "amp.")
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so mirrors and tracking variants compare equal.
+
+    Lowercases scheme and host, drops www./m./amp. prefixes, default ports,
+    fragments, tracking query parameters, AMP suffixes and trailing slashes,
+    and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/+", "/", parts.path or "/")
+    path = re.sub(r"/amp/?$", "/", path)
+    path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS
+        and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+# -------------------------
+# CONTENT FINGERPRINTS
+# -------------------------
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 4
+# fingerprints within this Hamming distance are treated as the same page
+NEAR_DUPLICATE_DISTANCE = 3
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int:
+    """64-bit SimHash over word shingles of the text."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        ]
+
+    if not shingles:
+        return 0
+
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        for shingle in shingles
+    )
+    # one row of bits per shingle, most significant bit first
+    bits = np.unpackbits(
+        np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), -1), axis=1
+    )
+    # a bit is set when more shingles have it set than not (weight > 0)
+    majority = 2 * bits.sum(axis=0, dtype=np.int64) > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# -------------------------
+# PER-RUN INDEX
+# -------------------------
+
+
+class DedupIndex:
+    """Canonical URLs and content fingerprints seen during one research run.
+
+    Serializes to a plain dict so it can live in graph state between
+    tool_node rounds.
+    """
+
+    def __init__(self, urls=None, fingerprints=None):
+        self.urls = set(urls or [])
+        self.fingerprints = list(fingerprints or [])
+        self._lock = threading.Lock()
+        # simhash of each (url, text) checked so far, shared with copies so
+        # registering a source after a trial dedupe does not hash it again
+        self._fingerprint_memo: dict = {}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "DedupIndex":
+        data = data or {}
+        return cls(data.get("urls"), data.get("fingerprints"))
+
+    def to_dict(self) -> dict:
+        return {"urls": sorted(self.urls), "fingerprints": list(self.fingerprints)}
+
+    def copy(self) -> "DedupIndex":
+        """Independent index with the same sources, for a trial dedupe."""
+        with self._lock:
+            other = DedupIndex(self.urls, self.fingerprints)
+        other._fingerprint_memo = self._fingerprint_memo
+        return other
+
+    def _fingerprint(self, canonical: str, text: str) -> Optional[int]:
+        if not text.strip():
+            return None
+        key = (canonical, hash(text))
+        fingerprint = self._fingerprint_memo.get(key)
+        if fingerprint is None:
+            fingerprint = self._fingerprint_memo[key] = simhash(text)
+        return fingerprint
+
+    def check_and_add(self, url: str, text: str = "") -> Optional[str]:
+        """Register a source; return why it is a duplicate, or None if new.
+
+        Returns "url" for a canonical-URL match, "content" for a
+        near-duplicate body, None when the source was added to the index.
+        """
+        canonical = canonicalize_url(url) if url else ""
+        fingerprint = self._fingerprint(canonical, text)
+
+        with self._lock:
+            if canonical and canonical in self.urls:
+                return "url"
+
+            if fingerprint is not None and any(
+                hamming_distance(fingerprint, seen) <= NEAR_DUPLICATE_DISTANCE
+                for seen in self.fingerprints
+            ):
+                if canonical:
+                    self.urls.add(canonical)
+                return "content"
+
+            if canonical:
+                self.urls.add(canonical)
+            if fingerprint is not None:
+                self.fingerprints.append(fingerprint)
+            return None
+
+
+# tool_node activates the run's index around tool execution so search
+# tools dedupe against everything the run has already seen.
+_active_index: ContextVar[Optional[DedupIndex]] = ContextVar(
+    "dedup_index", default=None
+)
+
+
+@contextmanager
+def use_dedup_index(index: DedupIndex):
+    token = _active_index.set(index)
+    try:
+        yield index
+    finally:
+        _active_index.reset(token)
+
+
+def active_dedup_index() -> Optional[DedupIndex]:
+    return _active_index.get()
+
+
+def _result_text(result: dict) -> str:
+    return result.get("raw_content") or result.get("content") or ""
+
+
+def dedupe_search_results(
+    search_results: dict, index: Optional[DedupIndex] = None, register: bool = True
+) -> tuple[dict, dict]:
+    """Drop results already seen by URL or near-duplicate content.
+
+    Args:
+        search_results: Raw Tavily-style response with a "results" list.
+        index: Index to check against; defaults to the run's active index,
+            or a fresh one that only dedupes within this response.
+        register: Add the kept results to the index. Pass False when not
+            every kept result reaches the model (e.g. packing drops some
+            over budget) and call register_sources with the ones that do.
+
+    Returns:
+        Tuple of (response copy with duplicates removed, removal counts).
+    """
+    if index is None:
+        index = active_dedup_index() or DedupIndex()
+    if not register:
+        # duplicates within this response are still caught by the copy
+        index = index.copy()
+
+    kept = []
+    removed = {"duplicate_urls": 0, "near_duplicates": 0}
+
+    for result in search_results.get("results", []):
+        if not isinstance(result, dict):
+            continue
+
+        reason = index.check_and_add(result.get("url", ""), _result_text(result))
+        if reason == "url":
+            removed["duplicate_urls"] += 1
+        elif reason == "content":
+            removed["near_duplicates"] += 1
+        else:
+            kept.append(result)
+
+    return {**search_results, "results": kept}, removed
+
+
+def register_sources(results: list, index: Optional[DedupIndex] = None) -> None:
+    """Add results delivered to the model to the index (the run's by default)."""
+    if index is None:
+        index = active_dedup_index()
+    if index is None:
+        return
+    for result in results:
+        index.check_and_add(result.get("url", ""), _result_text(result))
@@ -0,0 +1,70 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.model_registry import get_or_create, registered
+
+
+# -------------------------
+# POOLED HTTP SESSIONS
+# -------------------------
+
+# One long-lived requests.Session per API, shared by every run and thread.
+# Its connections are kept alive between calls, so only the first request
+# to a host (and one per extra concurrent request) pays for the TCP and TLS
+# handshakes. The pool holds one connection per search that can be in
+# flight at once: every concurrent run may have a Tavily and a DuckDuckGo
+# call outstanding during a hedged search.
+MAX_CONCURRENT_RUNS = int(os.getenv("RESEARCH_MAX_CONCURRENT_RUNS", "16"))
+HTTP_POOL_SIZE = int(os.getenv("RESEARCH_HTTP_POOL_SIZE", str(2 * MAX_CONCURRENT_RUNS)))
+# distinct hosts per session whose pools are kept
+HTTP_POOL_HOSTS = 4
+HTTP_TIMEOUT_SEC = float(os.getenv("RESEARCH_HTTP_TIMEOUT_SEC", "60"))
+
+
+def get_http_session(name: str) -> requests.Session:
+    """Shared keep-alive session for one API, e.g. "tavily"."""
+
+    def build():
+        session = requests.Session()
+        # retries belong to the provider guard, not to urllib3
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return get_or_create(("http_session", name), build)
+
+
+def pool_stats(session: requests.Session) -> dict:
+    """Requests sent and connections opened by a session's pools.
+
+    Every request beyond the connections opened reused a live connection,
+    i.e. skipped a TCP (and TLS) handshake.
+    """
+    connections = sent = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                sent += pool.num_requests
+    return {
+        "requests": sent,
+        "connections_opened": connections,
+        "handshakes_saved": max(0, sent - connections),
+    }
+
+
+def http_pool_stats() -> dict:
+    """pool_stats of every shared session created so far, keyed by name."""
+    return {
+        key[1]: pool_stats(session)
+        for key, session in registered("http_session").items()
+    }
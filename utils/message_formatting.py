@@ -1,15 +1,39 @@
+import hashlib
 import json
+import os
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from datetime import datetime
 from langchain_core.messages import HumanMessage
-from langchain.chat_models import init_chat_model
 from utils.structured_output_schema import Summary
 from utils.prompt import summarize_webpage_prompt
+from utils.cache import SQLiteCache, make_cache_key
+from utils.model_registry import get_chat_model
+from utils.call_stats import record_call_stat
+from utils.dedup import dedupe_search_results
 
 console = Console()
-summarization_model = init_chat_model(model="openai:gpt-4.1-mini")
+SUMMARIZATION_MODEL_NAME = "openai:gpt-4.1-mini"
+
+
+def get_summarization_model():
+    return get_chat_model(SUMMARIZATION_MODEL_NAME)
+
+
+# Summaries are content-addressed: the key is a hash of the raw page plus
+# the prompt/model version, so editing the prompt invalidates old entries.
+SUMMARY_PROMPT_VERSION = hashlib.sha256(
+    (SUMMARIZATION_MODEL_NAME + summarize_webpage_prompt).encode("utf-8")
+).hexdigest()[:12]
+SUMMARY_CACHE_MAX_ENTRIES = 20000
+
+summary_cache = SQLiteCache("webpage_summaries", max_entries=SUMMARY_CACHE_MAX_ENTRIES)
+
+
+def summary_cache_key(webpage_content: str) -> str:
+    content_hash = hashlib.sha256(webpage_content.encode("utf-8")).hexdigest()
+    return make_cache_key("summary", SUMMARY_PROMPT_VERSION, content_hash)
 
 
 def format_message_content(message):
@@ -65,8 +89,39 @@ def format_messages(messages):
 
 
 def get_today_str() -> str:
-    """Get current date in a human-readable format."""
-    return datetime.now().strftime("%a %b %-d, %Y")
+    """Get current date in a human-readable format.
+
+    RESEARCH_FIXED_DATE overrides it, so recorded cassettes (whose prompts
+    embed the date) replay identically on later days.
+    """
+    fixed_date = os.getenv("RESEARCH_FIXED_DATE")
+    return fixed_date or datetime.now().strftime("%a %b %-d, %Y")
+
+
+def _summary_messages(webpage_content: str) -> list:
+    return [
+        HumanMessage(
+            content=summarize_webpage_prompt.format(
+                webpage_content=webpage_content,
+                date=get_today_str(),
+            )
+        )
+    ]
+
+
+def _format_summary(summary: Summary) -> str:
+    return (
+        f"<summary>\n{summary.summary}\n</summary>\n\n"
+        f"<key_excerpts>\n{summary.key_excerpts}\n</key_excerpts>"
+    )
+
+
+def _truncate_content(webpage_content: str) -> str:
+    return (
+        webpage_content[:1000] + "..."
+        if len(webpage_content) > 1000
+        else webpage_content
+    )
 
 
 def summarize_webpage_content(webpage_content: str) -> str:
@@ -78,49 +133,108 @@ def summarize_webpage_content(webpage_content: str) -> str:
     Returns:
         Formatted summary with key excerpts
     """
+    cache_key = summary_cache_key(webpage_content)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # Set up structured output model for summarization
-        structured_model = summarization_model.with_structured_output(Summary)
+        structured_model = get_summarization_model().with_structured_output(Summary)
 
         # Generate summary
-        summary = structured_model.invoke(
-            [
-                HumanMessage(
-                    content=summarize_webpage_prompt.format(
-                        webpage_content=webpage_content,
-                        date=datetime.now().strftime("%a %b %-d, %Y"),
-                    )
-                )
-            ]
-        )
+        summary = structured_model.invoke(_summary_messages(webpage_content))
 
         # Format summary with clear structure
-        formatted_summary = (
-            f"<summary>\n{summary.summary}\n</summary>\n\n"
-            f"<key_excerpts>\n{summary.key_excerpts}\n</key_excerpts>"
-        )
+        formatted_summary = _format_summary(summary)
 
+        # only real summaries are cached; truncation fallbacks are retried
+        summary_cache.set(cache_key, formatted_summary)
         return formatted_summary
 
     except Exception as e:
         print(f"Failed to summarize webpage: {str(e)}")
-        return (
-            webpage_content[:1000] + "..."
-            if len(webpage_content) > 1000
-            else webpage_content
-        )
+        return _truncate_content(webpage_content)
+
+
+SUMMARY_MAX_CONCURRENCY = 8
+
+
+def summarize_webpage_contents(
+    webpage_contents: list[str], max_concurrency: int = SUMMARY_MAX_CONCURRENCY
+) -> list[str]:
+    """Summarize several webpages in one batched, concurrent model call.
+
+    Cached pages are served without a model call; the rest go through
+    `.batch` with at most `max_concurrency` requests in flight. A page whose
+    summarization fails falls back to its truncated content on its own.
+
+    Args:
+        webpage_contents: Raw webpage contents to summarize
+        max_concurrency: Maximum concurrent summarization requests
+
+    Returns:
+        Formatted summaries in the same order as the input
+    """
+    summaries: list = [None] * len(webpage_contents)
+    pending = []
+
+    for i, webpage_content in enumerate(webpage_contents):
+        cache_key = summary_cache_key(webpage_content)
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            summaries[i] = cached
+        else:
+            pending.append((i, cache_key, webpage_content))
+
+    if not pending:
+        return summaries
+
+    structured_model = get_summarization_model().with_structured_output(Summary)
+    responses = structured_model.batch(
+        [_summary_messages(content) for _, _, content in pending],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True,
+    )
+
+    for (i, cache_key, webpage_content), summary in zip(pending, responses):
+        if isinstance(summary, Exception):
+            print(f"Failed to summarize webpage: {str(summary)}")
+            summaries[i] = _truncate_content(webpage_content)
+            continue
+
+        summaries[i] = _format_summary(summary)
+        summary_cache.set(cache_key, summaries[i])
 
+    return summaries
 
-def process_search_results(search_results: dict) -> dict:
+
+def process_search_results(
+    search_results: dict,
+    max_concurrency: int = SUMMARY_MAX_CONCURRENCY,
+    dedupe: bool = True,
+) -> dict:
     """Process Tavily search results by summarizing content.
 
+    Sources already seen in this run (same canonical URL or near-duplicate
+    content) are dropped first, then all remaining raw pages are summarized
+    in a single batch.
+
     Args:
         search_results: Raw Tavily response dictionary.
+        max_concurrency: Maximum concurrent summarization requests.
+        dedupe: False when the caller already ran dedupe_search_results;
+            a second pass would find every result in the run's index.
 
     Returns:
         Dictionary keyed by URL with summarized content.
     """
     summarized_results = {}
+    to_summarize = []
+
+    if dedupe:
+        search_results, removed = dedupe_search_results(search_results)
+        record_call_stat("duplicates_removed", sum(removed.values()))
 
     results = search_results.get("results", [])
 
@@ -134,7 +248,8 @@ def process_search_results(search_results: dict) -> dict:
 
         raw_content = result.get("raw_content")
         if raw_content:
-            content = summarize_webpage_content(raw_content)
+            to_summarize.append((url, raw_content))
+            content = None
         else:
             content = result.get("content", "")
 
@@ -143,6 +258,13 @@ def process_search_results(search_results: dict) -> dict:
             "content": content,
         }
 
+    summaries = summarize_webpage_contents(
+        [raw_content for _, raw_content in to_summarize],
+        max_concurrency=max_concurrency,
+    )
+    for (url, _), summary in zip(to_summarize, summaries):
+        summarized_results[url]["content"] = summary
+
     return summarized_results
 
 
@@ -0,0 +1,94 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+# -------------------------
+# LAZY CLIENT REGISTRY
+# -------------------------
+
+# Process-wide cache of chat models and other expensive clients. Nothing
+# is constructed at import time; the first caller builds the client and
+# every later caller (any run, any thread) reuses it.
+_registry: dict = {}
+# re-entrant: get_tool_model's factory calls get_chat_model under the lock
+_lock = threading.RLock()
+
+
+def get_or_create(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """Return the client registered under key, building it on first use."""
+    client = _registry.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        if key not in _registry:
+            _registry[key] = factory()
+        return _registry[key]
+
+
+def register(key: Hashable, client: Any) -> None:
+    """Install a client under key, e.g. a fake model for offline runs."""
+    with _lock:
+        _registry[key] = client
+
+
+def registered(kind: str) -> dict:
+    """Clients whose key is a tuple starting with kind, e.g. "chat"."""
+    with _lock:
+        return {
+            key: client
+            for key, client in _registry.items()
+            if isinstance(key, tuple) and key and key[0] == kind
+        }
+
+
+def reset() -> None:
+    """Drop every cached client so the next lookup rebuilds it."""
+    with _lock:
+        _registry.clear()
+
+
+def chat_model_key(model: str, **kwargs) -> tuple:
+    return ("chat", model, tuple(sorted(kwargs.items())))
+
+
+# providers whose chat models take max_retries (disabled in favour of the guard)
+SDK_RETRY_PROVIDERS = ("openai", "anthropic", "google_genai")
+
+
+def get_chat_model(model: str, **kwargs):
+    """Return a shared chat model for the given provider:model string."""
+
+    def build():
+        # imported lazily: pulling in langchain's provider integrations is
+        # the slowest part of importing the agent modules
+        from langchain.chat_models import init_chat_model
+        from utils.cassette import CassetteChatModel, get_cassette
+        from utils.resilience import GuardedChatModel
+
+        cassette = get_cassette()
+        if cassette.mode == "replay":
+            # served entirely from recordings: no client, no API key
+            return CassetteChatModel(model_key=model)
+
+        # rate limits, retries and the circuit breaker live in the guard;
+        # SDK-level retries on top would multiply the attempts
+        provider_kwargs = dict(kwargs)
+        if model.split(":", 1)[0] in SDK_RETRY_PROVIDERS:
+            provider_kwargs.setdefault("max_retries", 0)
+        chat_model = GuardedChatModel(
+            inner=init_chat_model(model=model, **provider_kwargs), guard_name=model
+        )
+        if cassette.mode == "record":
+            return CassetteChatModel(inner=chat_model, model_key=model)
+        return chat_model
+
+    return get_or_create(chat_model_key(model, **kwargs), build)
+
+
+def get_tool_model(model: str, tools: list, **kwargs):
+    """Return a shared chat model with the given tools bound."""
+    # tools are BaseTools or, for schema-only tools, pydantic models
+    names = tuple(getattr(t, "name", None) or t.__name__ for t in tools)
+    key = ("tools", chat_model_key(model, **kwargs), names)
+    return get_or_create(key, lambda: get_chat_model(model, **kwargs).bind_tools(tools))
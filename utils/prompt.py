@@ -365,6 +365,49 @@ CRITICAL REQUIREMENTS:
 
 The cleaned findings will be used for final report generation, so comprehensiveness is critical."""
 
+fold_research_prompt = """You are a research assistant keeping a running set of notes while a research agent is still working. For context, today's date is {date}.
+
+<Task>
+Fold the new observations below into the running notes for this research topic:
+RESEARCH TOPIC: {research_topic}
+
+Return the complete, updated notes. Everything already in the running notes must be kept; add every relevant new fact, number, name and quote from the new observations, verbatim where possible.
+</Task>
+
+<Guidelines>
+1. Merge duplicates: if a new source repeats something already noted, attach the new source to the existing statement instead of repeating it.
+2. Exclude think_tool reflections - they are internal reasoning, not research findings.
+3. Keep inline citations, and keep a "### Sources" list at the end with every URL seen so far, numbered sequentially without gaps.
+4. Do not summarize away details - a later step will produce the final cleaned findings from these notes.
+</Guidelines>
+
+<Running Notes>
+{running_notes}
+</Running Notes>
+
+<New Observations>
+{new_observations}
+</New Observations>
+"""
+
+compress_research_merge_message = """Below are running notes that were incrementally compiled while the research was conducted, followed by the research messages that were not yet folded into them.
+
+<Running Notes>
+{running_notes}
+</Running Notes>
+
+<Unfolded Messages>
+{new_observations}
+</Unfolded Messages>
+"""
+
+compress_research_excerpts_message = """Below is everything the researcher gathered. If it was too long, only the parts most relevant to the research topic are included: excerpts from the same source are in their original order, and [...] marks text that was left out.
+
+<Research Excerpts>
+{excerpts}
+</Research Excerpts>
+"""
+
 final_report_generation_prompt = """Based on all the research conducted, create a comprehensive, well-structured answer to the overall research brief:
 <Research Brief>
 {research_brief}
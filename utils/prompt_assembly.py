@@ -0,0 +1,114 @@
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+from utils.prompt import research_agent_prompt
+from utils.message_formatting import get_today_str
+from utils.result_packing import estimate_tokens
+
+
+# -------------------------
+# SYSTEM PROMPT
+# -------------------------
+
+
+def render_system_prompt() -> str:
+    """Render research_agent_prompt once; the result is frozen in run state.
+
+    Rendering per call would put a fresh string (and, around midnight, a new
+    date) at the head of every request and defeat provider prompt caching.
+    """
+    return research_agent_prompt.format(date=get_today_str())
+
+
+# -------------------------
+# MESSAGE ASSEMBLY
+# -------------------------
+
+# Replace tool outputs with short stubs once a later think_tool call has
+# reflected on them. A collapsed message never changes again, so the prefix
+# stays cache-stable after the one-time rewrite; off by default because
+# that rewrite costs one cache miss from the collapsed message onwards.
+COLLAPSE_REFLECTED_TOOL_OUTPUTS = False
+
+
+def _reflected_tool_message_ids(messages) -> set:
+    """ids of non-reflection tool outputs followed by a later think_tool call."""
+    reflected = set()
+    pending = []
+
+    for m in messages:
+        if isinstance(m, ToolMessage) and m.name != "think_tool":
+            pending.append(m.tool_call_id)
+        elif isinstance(m, AIMessage) and any(
+            tc["name"] == "think_tool" for tc in (m.tool_calls or [])
+        ):
+            reflected.update(pending)
+            pending = []
+
+    return reflected
+
+
+def collapse_stub(message: ToolMessage) -> ToolMessage:
+    tokens = estimate_tokens(str(message.content))
+    return ToolMessage(
+        content=(
+            f"[{message.name} output (~{tokens} tokens) collapsed after "
+            "reflection; see the think_tool notes that follow]"
+        ),
+        name=message.name,
+        tool_call_id=message.tool_call_id,
+        id=message.id,
+    )
+
+
+def assemble_messages(
+    system_prompt: str,
+    messages,
+    collapse_reflected: bool = COLLAPSE_REFLECTED_TOOL_OUTPUTS,
+) -> list:
+    """Build the llm_call request with a byte-identical prefix across turns.
+
+    Args:
+        system_prompt: System prompt rendered once per run.
+        messages: The run's researcher_messages (append-only).
+        collapse_reflected: Stub out tool outputs already reflected on.
+
+    Returns:
+        [SystemMessage] + history, where only the tail differs between turns.
+    """
+    history = list(messages)
+
+    if collapse_reflected:
+        reflected = _reflected_tool_message_ids(history)
+        history = [
+            (
+                collapse_stub(m)
+                if isinstance(m, ToolMessage) and m.tool_call_id in reflected
+                else m
+            )
+            for m in history
+        ]
+
+    return [SystemMessage(content=system_prompt)] + history
+
+
+# -------------------------
+# CACHE REPORTING
+# -------------------------
+
+
+def cached_input_tokens(resp) -> tuple[int, int]:
+    """Return (cached input tokens, total input tokens) for a model response."""
+    usage = getattr(resp, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return details.get("cache_read", 0) or 0, usage.get("input_tokens", 0) or 0
+
+
+def update_cache_metrics(token_metrics: dict, resp) -> None:
+    """Record the cached share of this call's input tokens.
+
+    Cached token totals are accumulated by utils.token_usage.
+    """
+    cached, total = cached_input_tokens(resp)
+
+    token_metrics.setdefault("cache_share_per_call", []).append(
+        round(cached / total, 3) if total else 0.0
+    )
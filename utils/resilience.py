@@ -0,0 +1,430 @@
+"""Process-wide rate limiting, retries and circuit breakers for provider calls.
+
+Every outbound call to a model or search provider goes through a
+ProviderGuard (one per provider:model, see get_guard):
+
+    - a token bucket caps the request rate, so parallel runs queue briefly
+      instead of tripping the provider's rate limit;
+    - 429/5xx and connection errors are retried with jittered exponential
+      backoff (honouring Retry-After when the provider sends one);
+    - a circuit breaker per provider opens after repeated failures and
+      fails calls fast (CircuitOpenError) until a cool-down has passed.
+
+All guards keep counters; resilience_stats() returns them.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from utils.model_registry import get_or_create, registered
+
+
+# -------------------------
+# LIMITS
+# -------------------------
+
+# (requests per second, burst) per provider; a "provider:model" entry
+# overrides its provider's default. Every model gets its own bucket.
+PROVIDER_RATE_LIMITS = {
+    "openai": (8.0, 16),
+    "anthropic": (4.0, 8),
+    "google_genai": (4.0, 8),
+    "tavily": (4.0, 8),
+    "duckduckgo": (1.0, 3),
+    "firecrawl": (1.0, 2),
+}
+DEFAULT_RATE_LIMIT = (4.0, 8)
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 20.0
+# longest a call waits for a rate-limit token before giving up
+MAX_THROTTLE_WAIT_SEC = 60.0
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SEC = 30.0
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# transport/SDK errors without a status code that are worth retrying
+RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "Timeout",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when no rate-limit token became available in time."""
+
+
+# -------------------------
+# ERROR CLASSIFICATION
+# -------------------------
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK/HTTP exception, if any."""
+    for obj in (exc, getattr(exc, "response", None)):
+        code = getattr(obj, "status_code", None) or getattr(obj, "status", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return isinstance(exc, (TimeoutError, ConnectionError)) or (
+        type(exc).__name__ in RETRYABLE_ERROR_NAMES
+    )
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, exc: Optional[BaseException] = None) -> float:
+    """Full-jitter exponential backoff, or the provider's Retry-After."""
+    hinted = retry_after(exc) if exc is not None else None
+    if hinted is not None:
+        return min(hinted, BACKOFF_MAX_SEC)
+    return random.uniform(0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2**attempt))
+
+
+# -------------------------
+# TOKEN BUCKET
+# -------------------------
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token if available; otherwise return seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = MAX_THROTTLE_WAIT_SEC) -> float:
+        """Block until a token is taken; return the time spent waiting."""
+        waited = 0.0
+        while True:
+            wait = self._reserve()
+            if wait == 0.0:
+                return waited
+            if waited + wait > timeout:
+                raise RateLimitTimeout(f"No rate-limit token within {timeout}s")
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, timeout: float = MAX_THROTTLE_WAIT_SEC) -> float:
+        waited = 0.0
+        while True:
+            wait = self._reserve()
+            if wait == 0.0:
+                return waited
+            if waited + wait > timeout:
+                raise RateLimitTimeout(f"No rate-limit token within {timeout}s")
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+# -------------------------
+# CIRCUIT BREAKER
+# -------------------------
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open every call fails fast. After `reset_sec` one trial call is
+    let through (half-open): success closes the circuit, failure re-opens it,
+    and a trial that never reached the provider is released for the next call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_sec: float = BREAKER_RESET_SEC,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_sec = reset_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError or admit the call; True if it is the trial."""
+        with self._lock:
+            if self.state == "half_open":
+                raise CircuitOpenError(
+                    f"{self.name} circuit half-open; trial in flight"
+                )
+            if self.state == "open":
+                remaining = self.reset_sec - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"{self.name} circuit open; retry in {remaining:.0f}s"
+                    )
+                # this caller is the trial; everyone else still fails fast
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def release_trial(self) -> None:
+        """Re-open without a new cool-down, so the next call makes the trial."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "open":
+                return
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """One breaker per provider: an outage affects all of its models."""
+    return get_or_create(("breaker", provider), lambda: CircuitBreaker(provider))
+
+
+# -------------------------
+# PROVIDER GUARD
+# -------------------------
+
+
+class ProviderGuard:
+    """Rate limit + retry + circuit breaker around calls to one provider:model."""
+
+    def __init__(self, name: str):
+        self.name = name
+        provider = name.split(":", 1)[0]
+        rate, burst = PROVIDER_RATE_LIMITS.get(
+            name, PROVIDER_RATE_LIMITS.get(provider, DEFAULT_RATE_LIMIT)
+        )
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = get_breaker(provider)
+        self.counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "short_circuited": 0,
+            "throttle_wait_sec": 0.0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[key] += value
+
+    def _before_attempt(self) -> bool:
+        try:
+            return self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("short_circuited")
+            raise
+
+    def _abandon(self, trial: bool) -> None:
+        if trial:
+            self.breaker.release_trial()
+
+    def _after_failure(self, exc: BaseException, attempt: int, trial: bool) -> bool:
+        """Record a failed attempt; True if it should be retried.
+
+        Every outcome resolves a half-open trial, so the breaker cannot be
+        left half-open (failing every call fast) by an unexpected error.
+        """
+        if isinstance(exc, RateLimitTimeout):
+            # never reached the provider: says nothing about its health
+            self._abandon(trial)
+            return False
+        if status_code(exc) == 429:
+            self._count("rate_limited")
+        if not is_retryable(exc):
+            # a bad request is the caller's problem, not a provider outage;
+            # the provider answered, so a trial call closes the circuit
+            if trial:
+                self.breaker.record_success()
+            self._count("failures")
+            return False
+
+        self.breaker.record_failure()
+        if attempt + 1 >= MAX_ATTEMPTS:
+            self._count("failures")
+            return False
+        self._count("retries")
+        return True
+
+    def _succeeded(self) -> None:
+        self.breaker.record_success()
+        self._count("successes")
+
+    def call(self, fn, *args, **kwargs) -> Any:
+        self._count("calls")
+        for attempt in range(MAX_ATTEMPTS):
+            trial = self._before_attempt()
+            try:
+                self._count("throttle_wait_sec", self.bucket.acquire())
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self._after_failure(e, attempt, trial):
+                    raise
+                time.sleep(backoff_delay(attempt, e))
+                continue
+            except BaseException:
+                # interrupted mid-trial
+                self._abandon(trial)
+                raise
+            self._succeeded()
+            return result
+
+    async def acall(self, fn, *args, **kwargs) -> Any:
+        """Async counterpart of call for coroutine functions."""
+        self._count("calls")
+        for attempt in range(MAX_ATTEMPTS):
+            trial = self._before_attempt()
+            try:
+                self._count("throttle_wait_sec", await self.bucket.aacquire())
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not self._after_failure(e, attempt, trial):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, e))
+                continue
+            except BaseException:
+                # cancelled mid-trial
+                self._abandon(trial)
+                raise
+            self._succeeded()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["throttle_wait_sec"] = round(counters["throttle_wait_sec"], 3)
+        counters["breaker"] = self.breaker.state
+        return counters
+
+
+def get_guard(name: str) -> ProviderGuard:
+    """Shared guard for a provider ("tavily") or provider:model ("openai:gpt-4o")."""
+    return get_or_create(("guard", name), lambda: ProviderGuard(name))
+
+
+def resilience_stats() -> dict:
+    """Counters of every guard created so far, keyed by guard name."""
+    return {key[1]: guard.stats() for key, guard in registered("guard").items()}
+
+
+# -------------------------
+# GUARDED CHAT MODEL
+# -------------------------
+
+
+class GuardedChatModel(BaseChatModel):
+    """Chat model whose provider calls all go through get_guard(guard_name).
+
+    Tools are formatted by `inner`, so bind_tools/with_structured_output
+    behave exactly like the wrapped provider model. Streaming calls are
+    rate limited and retried only until the first chunk arrives.
+    """
+
+    inner: BaseChatModel
+    guard_name: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"guarded-{self.inner._llm_type}"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(
+            **self.inner.bind_tools(tools, tool_choice=tool_choice, **kwargs).kwargs
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return get_guard(self.guard_name).call(
+            self.inner._generate, messages, stop=stop, **kwargs
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await get_guard(self.guard_name).acall(
+            self.inner._agenerate, messages, stop=stop, **kwargs
+        )
+
+    def _should_stream(self, *, async_api, run_manager=None, **kwargs) -> bool:
+        # stream only when the wrapped model itself would
+        return self.inner._should_stream(
+            async_api=async_api, run_manager=run_manager, **kwargs
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        guard = get_guard(self.guard_name)
+
+        def first_chunk():
+            stream = self.inner._stream(messages, stop=stop, **kwargs)
+            return stream, next(stream, None)
+
+        stream, chunk = guard.call(first_chunk)
+        while chunk is not None:
+            yield chunk
+            chunk = next(stream, None)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        guard = get_guard(self.guard_name)
+
+        async def first_chunk():
+            stream = self.inner._astream(messages, stop=stop, **kwargs)
+            return stream, await anext(stream, None)
+
+        stream, chunk = await guard.acall(first_chunk)
+        while chunk is not None:
+            yield chunk
+            chunk = await anext(stream, None)
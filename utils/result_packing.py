@@ -0,0 +1,121 @@
+import json
+
+
+# -------------------------
+# PACKING BUDGETS
+# -------------------------
+
+# Budgets are in approximate tokens (see estimate_tokens).
+SEARCH_TOKEN_BUDGET = 6000
+PER_SOURCE_TOKEN_BUDGET = 800
+# below this many tokens a source is not worth including
+MIN_SOURCE_TOKENS = 60
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text to roughly max_tokens, cutting at a whitespace boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    cut = text.rfind(" ", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return text[:cut].rstrip() + " ..."
+
+
+def rank_sources(results: list) -> list:
+    """Order Tavily results by relevance score, keeping only usable entries."""
+    usable = [
+        r
+        for r in results
+        if isinstance(r, dict)
+        and r.get("url")
+        and (r.get("content") or r.get("raw_content"))
+    ]
+    return sorted(usable, key=lambda r: r.get("score") or 0.0, reverse=True)
+
+
+def _source_text(result: dict, max_tokens: int) -> str:
+    # Tavily's `content` is the query-relevant snippet, so it goes first;
+    # the rest of the budget is filled from the start of the raw page.
+    snippet = (result.get("content") or "").strip()
+    raw = (result.get("raw_content") or "").strip()
+
+    text = trim_to_tokens(snippet, max_tokens)
+    remaining = max_tokens - estimate_tokens(text)
+    if raw and remaining >= MIN_SOURCE_TOKENS:
+        text = (text + "\n\n" if text else "") + trim_to_tokens(raw, remaining)
+    return text
+
+
+def pack_search_results(
+    search_results: dict,
+    token_budget: int = SEARCH_TOKEN_BUDGET,
+    per_source_tokens: int = PER_SOURCE_TOKEN_BUDGET,
+) -> tuple[str, dict]:
+    """Rank, trim and pack a raw Tavily response into a token budget.
+
+    Args:
+        search_results: Raw Tavily response dictionary.
+        token_budget: Approximate token budget for the whole packed output.
+        per_source_tokens: Approximate token budget for a single source.
+
+    Returns:
+        Tuple of (packed string for the ToolMessage, packing stats with
+        raw/packed/saved token counts and kept/dropped source counts).
+    """
+    if not isinstance(search_results, dict):
+        text = str(search_results)
+        tokens = estimate_tokens(text)
+        return text, {
+            "raw_tokens": tokens,
+            "packed_tokens": tokens,
+            "saved_tokens": 0,
+            "sources_kept": 0,
+            "sources_dropped": 0,
+        }
+
+    preamble = "Search results: \n"
+    sources = rank_sources(search_results.get("results", []))
+    remaining = token_budget - estimate_tokens(preamble)
+    blocks = []
+
+    for result in sources:
+        if remaining < MIN_SOURCE_TOKENS:
+            break
+
+        header = (
+            f"\n--- SOURCE {len(blocks) + 1}: {result.get('title', '')} ---\n"
+            f"URL: {result['url']}\n\n"
+        )
+        body_budget = min(per_source_tokens, remaining) - estimate_tokens(header)
+        if body_budget < MIN_SOURCE_TOKENS:
+            break
+
+        block = header + _source_text(result, body_budget) + "\n"
+        blocks.append(block)
+        remaining -= estimate_tokens(block)
+
+    if blocks:
+        packed = preamble + "".join(blocks)
+    else:
+        packed = "No valid search results found. Please try different search queries or use a different search API."
+
+    raw_tokens = estimate_tokens(json.dumps(search_results, default=str))
+    packed_tokens = estimate_tokens(packed)
+
+    return packed, {
+        "raw_tokens": raw_tokens,
+        "packed_tokens": packed_tokens,
+        "saved_tokens": max(raw_tokens - packed_tokens, 0),
+        "sources_kept": len(blocks),
+        "sources_dropped": len(sources) - len(blocks),
+    }
@@ -0,0 +1,245 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+
+# -------------------------
+# LOCAL BM25 RETRIEVAL
+# -------------------------
+
+# When a stage's inputs (a run's tool outputs, a supervisor's notes) do not
+# fit its context budget, they are split into chunks, indexed in memory
+# with BM25, and only the chunks that best match each section of the brief
+# are passed on. The term-document matrix is kept in CSR form as NumPy
+# arrays: one row of (chunk, weight) postings per term, so scoring a query
+# touches only the postings of its terms.
+
+CHUNK_CHARS = 1_200
+TOP_K_PER_SECTION = 6
+MAX_SECTIONS = 12
+# brief fragments with fewer terms are merged into their neighbour
+MIN_SECTION_TERMS = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    """a about all also an and any are as at be been but by can do does for
+    from has have how i if in into is it its me more my must not of on or our
+    so such than that the their them then there these they this those to up
+    us was we were what when where which who why will with would you your""".split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SECTION_BREAK = re.compile(r"[\n.?!;,:]+")
+_OMITTED = "[...]"
+
+
+def tokenize(text: str) -> list:
+    return [
+        t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1
+    ]
+
+
+class Chunk(NamedTuple):
+    label: str
+    # index of the document the chunk came from, and its position in it
+    doc: int
+    position: int
+    text: str
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> list:
+    """Split text into chunks of at most max_chars, on line boundaries if possible."""
+    chunks, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            cut = line.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:cut])
+            line = line[cut:]
+        if len(current) + len(line) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        chunks.append(current)
+    return [c.strip() for c in chunks if c.strip()]
+
+
+def brief_sections(brief: str) -> list:
+    """Split a brief into the fragments that are retrieved for separately."""
+    sections = []
+    for part in _SECTION_BREAK.split(brief):
+        part = part.strip()
+        if not part:
+            continue
+        if sections and len(tokenize(sections[-1])) < MIN_SECTION_TERMS:
+            sections[-1] = f"{sections[-1]} {part}"
+        else:
+            sections.append(part)
+    if len(sections) > 1 and len(tokenize(sections[-1])) < MIN_SECTION_TERMS:
+        tail = sections.pop()
+        sections[-1] = f"{sections[-1]} {tail}"
+    return sections[:MAX_SECTIONS] or [brief]
+
+
+class ChunkIndex:
+    """In-memory BM25 index over a list of chunks."""
+
+    def __init__(self, chunks: list, k1: float = BM25_K1, b: float = BM25_B):
+        self.chunks = chunks
+        self.term_ids: dict = {}
+
+        terms, docs, counts = [], [], []
+        lengths = np.zeros(len(chunks))
+        for doc, chunk in enumerate(chunks):
+            tokens = tokenize(chunk.text)
+            lengths[doc] = len(tokens)
+            for term, count in Counter(tokens).items():
+                terms.append(self.term_ids.setdefault(term, len(self.term_ids)))
+                docs.append(doc)
+                counts.append(count)
+
+        terms = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        self.docs = np.asarray(docs, dtype=np.int64)[order]
+        tf = np.asarray(counts, dtype=np.float64)[order]
+
+        df = np.bincount(terms, minlength=len(self.term_ids))
+        self.indptr = np.concatenate(([0], np.cumsum(df)))
+        idf = np.log1p((len(chunks) - df + 0.5) / (df + 0.5))
+        avg_length = lengths.mean() if len(chunks) and lengths.mean() else 1.0
+        norm = k1 * (1 - b + b * lengths[self.docs] / avg_length)
+        # BM25 contribution of each posting, precomputed once
+        self.weights = idf[terms] * tf * (k1 + 1) / (tf + norm)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks))
+        for term in set(tokenize(query)):
+            t = self.term_ids.get(term)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            # a term's postings name each chunk at most once
+            scores[self.docs[lo:hi]] += self.weights[lo:hi]
+        return scores
+
+    def search(self, query: str, k: int) -> list:
+        """Indices of the k best-matching chunks, best first."""
+        scores = self.scores(query)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [int(i) for i in top if scores[i] > 0]
+
+    def retrieve(self, sections: list, k: int, max_chars: int) -> list:
+        """Top-k chunks per section within max_chars, in document order.
+
+        Sections take turns, so each gets its best chunk before any gets a
+        second one.
+        """
+        ranked = [self.search(section, k) for section in sections]
+        chosen, used = set(), 0
+        for rank in range(k):
+            for hits in ranked:
+                if rank >= len(hits) or hits[rank] in chosen:
+                    continue
+                size = len(self.chunks[hits[rank]].text)
+                if used + size > max_chars:
+                    continue
+                chosen.add(hits[rank])
+                used += size
+        return sorted(chosen)
+
+
+def _format_documents(documents: list) -> str:
+    return "\n\n".join(f"[{label}]\n{text}" for label, text in documents)
+
+
+def _format_chunks(chunks: list) -> str:
+    parts, previous = [], None
+    for chunk in chunks:
+        if previous is None or chunk.doc != previous.doc:
+            parts.append(f"[{chunk.label}]")
+            if chunk.position > 0:
+                parts.append(_OMITTED)
+        elif chunk.position > previous.position + 1:
+            parts.append(_OMITTED)
+        parts.append(chunk.text)
+        previous = chunk
+    return "\n\n".join(parts)
+
+
+def index_documents(documents: list) -> tuple[list, ChunkIndex]:
+    """Chunk (label, text) documents and index the chunks."""
+    chunks = [
+        Chunk(label, doc, position, text)
+        for doc, (label, document) in enumerate(documents)
+        for position, text in enumerate(chunk_text(document))
+    ]
+    return chunks, ChunkIndex(chunks)
+
+
+# the last indexes built, so stages that retrieve from the same documents
+# (a run's compression, then its report) share one index
+INDEX_CACHE_SIZE = 16
+_index_cache: OrderedDict = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def shared_index(key, documents: list) -> tuple[list, ChunkIndex]:
+    """index_documents(documents), reused while key names the same documents."""
+    with _index_cache_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    built = index_documents(documents)
+    with _index_cache_lock:
+        _index_cache[key] = built
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return built
+
+
+def relevant_context(
+    brief: str,
+    documents: list,
+    max_chars: int,
+    k: int = TOP_K_PER_SECTION,
+    index: tuple | None = None,
+) -> str:
+    """Documents as labelled text, cut down to what the brief needs.
+
+    Args:
+        brief: Research brief or topic; each of its sections is a query.
+        documents: (label, text) pairs, e.g. tool outputs or notes.
+        max_chars: Context budget. Documents that fit are returned whole.
+        k: Minimum chunks retrieved per section of the brief; raised so
+            that a brief with few sections can still fill the budget.
+        index: index_documents(documents), when the same documents are
+            retrieved from more than once.
+
+    Budget the retrieved chunks leave unused (all of it when no term of
+    the brief occurs in the documents, e.g. a brief in another language)
+    is filled with the remaining chunks in document order.
+    """
+    full = _format_documents(documents)
+    if len(full) <= max_chars:
+        return full
+
+    chunks, chunk_index = index or index_documents(documents)
+    sections = brief_sections(brief)
+    k = max(k, max_chars // (CHUNK_CHARS * len(sections)))
+    picked = set(chunk_index.retrieve(sections, k, max_chars))
+    used = sum(len(chunks[i].text) for i in picked)
+    for i, chunk in enumerate(chunks):
+        if i not in picked and used + len(chunk.text) <= max_chars:
+            picked.add(i)
+            used += len(chunk.text)
+    return _format_chunks([chunks[i] for i in sorted(picked)])
@@ -0,0 +1,67 @@
+import time
+
+from langchain_core.messages import AIMessage
+
+
+# -------------------------
+# STREAMED GENERATION
+# -------------------------
+
+# Long user-facing generations (the final report) are streamed: each chunk
+# reaches the graph's stream_mode="messages" consumers as soon as the
+# provider sends it, and the call is timed from request to first visible
+# token (TTFT) and to the last chunk.
+
+# providers that only report token usage on a stream when asked to
+STREAM_USAGE_PROVIDERS = ("openai",)
+
+
+def stream_model_kwargs(model: str) -> dict:
+    """Extra chat model kwargs so streamed responses still carry usage."""
+    if model.split(":", 1)[0] in STREAM_USAGE_PROVIDERS:
+        return {"stream_usage": True}
+    return {}
+
+
+def _timing(started: float, first_token: float | None, chunks: int) -> dict:
+    total = time.perf_counter() - started
+    return {
+        "ttft_sec": round((first_token or time.perf_counter()) - started, 4),
+        "generation_sec": round(total, 4),
+        "chunks": chunks,
+    }
+
+
+def stream_response(model, messages: list) -> tuple[AIMessage, dict]:
+    """Stream a chat model call; return the merged message and its timing."""
+    started = time.perf_counter()
+    first_token = None
+    merged = None
+    chunks = 0
+
+    for chunk in model.stream(messages):
+        if first_token is None and chunk.content:
+            first_token = time.perf_counter()
+        merged = chunk if merged is None else merged + chunk
+        chunks += 1
+
+    timing = _timing(started, first_token, chunks)
+    # AIMessageChunk is an AIMessage, usage_metadata summed over the chunks
+    return merged or AIMessage(content=""), timing
+
+
+async def astream_response(model, messages: list) -> tuple[AIMessage, dict]:
+    """Async counterpart of stream_response."""
+    started = time.perf_counter()
+    first_token = None
+    merged = None
+    chunks = 0
+
+    async for chunk in model.astream(messages):
+        if first_token is None and chunk.content:
+            first_token = time.perf_counter()
+        merged = chunk if merged is None else merged + chunk
+        chunks += 1
+
+    timing = _timing(started, first_token, chunks)
+    return merged or AIMessage(content=""), timing
@@ -17,3 +17,16 @@ class Summary(BaseModel):
     key_excerpts: str = Field(
         description="Important quotes and excerpts from the content"
     )
+
+
+# ===== SUPERVISOR TOOLS ===============================================
+class ConductResearch(BaseModel):
+    """Delegate one research subtopic to a dedicated research agent."""
+
+    research_topic: str = Field(
+        description="The subtopic to research, as complete standalone instructions.",
+    )
+
+
+class ResearchComplete(BaseModel):
+    """Indicate that the research is complete."""
@@ -0,0 +1,393 @@
+"""Span-style timing of graph nodes and tools, exported through pluggable sinks.
+
+Sinks are selected with RESEARCH_METRICS_SINKS (comma separated):
+
+    console     pretty-prints each run log on stdout
+    jsonl       appends one JSON line per span and per run log to
+                RESEARCH_METRICS_JSONL (default .cache/metrics.jsonl)
+    prometheus  keeps in-process counters and histograms; render them with
+                render_prometheus() (served at GET /metrics by the service)
+    otel        emits OpenTelemetry spans through the globally configured
+                tracer provider (needs the opentelemetry-api package)
+
+With no sink configured, span() hands back a shared no-op object and
+emit_run_log() returns immediately, so instrumented code pays no clock
+reads, dict building or formatting.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+# -------------------------
+# SINKS
+# -------------------------
+
+
+class MetricsSink:
+    """Receives finished spans and run logs; subclasses override either."""
+
+    def export_span(self, record: dict) -> None:
+        pass
+
+    def export_run(self, log: dict) -> None:
+        pass
+
+
+class ConsoleSink(MetricsSink):
+    def export_run(self, log: dict) -> None:
+        print("\n===== AGENT RUN LOG =====")
+        print(json.dumps(log, indent=2))
+
+
+class JsonlSink(MetricsSink):
+    """Appends spans and run logs to a JSONL file, one record per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def export_span(self, record: dict) -> None:
+        self._write({"type": "span", **record})
+
+    def export_run(self, log: dict) -> None:
+        self._write({"type": "run", **log})
+
+
+DURATION_BUCKETS_SEC = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+class PrometheusSink(MetricsSink):
+    """In-process aggregates rendered in the Prometheus text format.
+
+    Span durations are histograms labelled by span and tool name; token
+    and payload sizes are counters; finished runs get their own histogram.
+    """
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS_SEC):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._durations: dict = {}
+        self._tokens: dict = {}
+        self._payload_chars: dict = {}
+        self._errors: dict = {}
+        self._runs = _Histogram(buckets)
+
+    def export_span(self, record: dict) -> None:
+        key = (record["name"], record.get("tool", ""))
+        with self._lock:
+            if key not in self._durations:
+                self._durations[key] = _Histogram(self.buckets)
+            self._durations[key].observe(record["duration_sec"])
+
+            for kind in ("input", "output"):
+                tokens = record.get(f"{kind}_tokens")
+                if tokens:
+                    self._tokens[key + (kind,)] = (
+                        self._tokens.get(key + (kind,), 0) + tokens
+                    )
+            if record.get("payload_chars"):
+                self._payload_chars[key] = (
+                    self._payload_chars.get(key, 0) + record["payload_chars"]
+                )
+            if record.get("error"):
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def export_run(self, log: dict) -> None:
+        with self._lock:
+            self._runs.observe(log.get("duration_sec", 0.0))
+
+    @staticmethod
+    def _render_histogram(lines: list, name: str, hist: _Histogram, **labels):
+        prefix = _labels(**labels)
+        sep = "," if prefix else ""
+        suffix = f"{{{prefix}}}" if prefix else ""
+        for bound, count in zip(hist.buckets, hist.counts):
+            lines.append(f'{name}_bucket{{{prefix}{sep}le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{prefix}{sep}le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum{suffix} {hist.sum}")
+        lines.append(f"{name}_count{suffix} {hist.count}")
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append(
+                "# HELP research_span_duration_seconds Wall time of graph nodes and tool calls."
+            )
+            lines.append("# TYPE research_span_duration_seconds histogram")
+            for (span, tool), hist in sorted(self._durations.items()):
+                self._render_histogram(
+                    lines, "research_span_duration_seconds", hist, span=span, tool=tool
+                )
+
+            lines.append(
+                "# HELP research_tokens_total Model tokens by span and direction."
+            )
+            lines.append("# TYPE research_tokens_total counter")
+            for (span, tool, kind), total in sorted(self._tokens.items()):
+                lines.append(
+                    f"research_tokens_total{{{_labels(span=span, tool=tool, kind=kind)}}} {total}"
+                )
+
+            lines.append(
+                "# HELP research_payload_chars_total Characters produced by spans."
+            )
+            lines.append("# TYPE research_payload_chars_total counter")
+            for (span, tool), total in sorted(self._payload_chars.items()):
+                lines.append(
+                    f"research_payload_chars_total{{{_labels(span=span, tool=tool)}}} {total}"
+                )
+
+            lines.append(
+                "# HELP research_span_errors_total Spans that ended with an error."
+            )
+            lines.append("# TYPE research_span_errors_total counter")
+            for (span, tool), total in sorted(self._errors.items()):
+                lines.append(
+                    f"research_span_errors_total{{{_labels(span=span, tool=tool)}}} {total}"
+                )
+
+            lines.append(
+                "# HELP research_run_duration_seconds Wall time of finished research runs."
+            )
+            lines.append("# TYPE research_run_duration_seconds histogram")
+            self._render_histogram(lines, "research_run_duration_seconds", self._runs)
+
+        return "\n".join(lines) + "\n"
+
+
+class OTelSink(MetricsSink):
+    """Re-emits finished spans through the OpenTelemetry tracer provider.
+
+    Exporter setup (OTLP endpoint, batching, resource) is left to the
+    standard OpenTelemetry SDK configuration of the hosting process.
+    """
+
+    def __init__(self, tracer_name: str = "deep-research"):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "The 'otel' metrics sink needs the opentelemetry-api package."
+            ) from e
+
+        self._tracer = trace.get_tracer(tracer_name)
+
+    def export_span(self, record: dict) -> None:
+        start_ns = int(record["start"] * 1e9)
+        end_ns = start_ns + int(record["duration_sec"] * 1e9)
+        attributes = {
+            f"research.{k}": v
+            for k, v in record.items()
+            if k not in ("name", "start", "duration_sec")
+            and isinstance(v, (str, bool, int, float))
+        }
+        otel_span = self._tracer.start_span(
+            record["name"], start_time=start_ns, attributes=attributes
+        )
+        otel_span.end(end_time=end_ns)
+
+
+SINK_TYPES = {
+    "console": ConsoleSink,
+    "jsonl": lambda: JsonlSink(
+        os.getenv("RESEARCH_METRICS_JSONL", os.path.join(".cache", "metrics.jsonl"))
+    ),
+    "prometheus": PrometheusSink,
+    "otel": OTelSink,
+}
+
+
+def sinks_from_env() -> list:
+    names = os.getenv("RESEARCH_METRICS_SINKS", "")
+    sinks = []
+    for name in names.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in SINK_TYPES:
+            raise ValueError(
+                f"Unknown metrics sink {name!r}; expected one of {sorted(SINK_TYPES)}"
+            )
+        sinks.append(SINK_TYPES[name]())
+    return sinks
+
+
+_sinks: list = sinks_from_env()
+
+
+def set_sinks(sinks: list) -> None:
+    """Replace the active sinks, e.g. [PrometheusSink()] or [] to disable."""
+    global _sinks
+    _sinks = list(sinks)
+
+
+def get_sinks() -> list:
+    return list(_sinks)
+
+
+def tracing_enabled() -> bool:
+    return bool(_sinks)
+
+
+def render_prometheus() -> Optional[str]:
+    """Prometheus exposition text, or None when that sink is not enabled."""
+    for sink in _sinks:
+        if isinstance(sink, PrometheusSink):
+            return sink.render()
+    return None
+
+
+# -------------------------
+# SPANS
+# -------------------------
+
+# attributes (run_id, loop, ...) inherited by every span opened beneath;
+# copied into tool worker threads along with the rest of the context
+_trace_context: ContextVar[dict] = ContextVar("trace_context", default={})
+
+
+@contextmanager
+def trace_context(**attrs):
+    """Attach attributes to every span opened inside the block."""
+    if not _sinks:
+        yield
+        return
+
+    token = _trace_context.set({**_trace_context.get(), **attrs})
+    try:
+        yield
+    finally:
+        _trace_context.reset(token)
+
+
+class Span:
+    """Times a block and exports it, with attributes, to the active sinks."""
+
+    __slots__ = ("name", "attrs", "start", "_t0")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record = {
+            "name": self.name,
+            "start": self.start,
+            "duration_sec": time.perf_counter() - self._t0,
+            **self.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        _export_span(record)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """Context manager timing a node or tool call; free when tracing is off."""
+    if not _sinks:
+        return _NOOP_SPAN
+    return Span(name, {**_trace_context.get(), **attrs})
+
+
+def usage_attrs(resp) -> dict:
+    """Token counts of a chat model response as span attributes."""
+    usage = getattr(resp, "usage_metadata", None) or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+    }
+
+
+def _export_span(record: dict) -> None:
+    for sink in _sinks:
+        try:
+            sink.export_span(record)
+        except Exception as e:
+            # telemetry must never fail a research run
+            print(f"Metrics sink {type(sink).__name__} failed: {e}")
+
+
+def emit_run_log(log: dict) -> None:
+    """Send a finished run's log to every sink."""
+    for sink in _sinks:
+        try:
+            sink.export_run(log)
+        except Exception as e:
+            print(f"Metrics sink {type(sink).__name__} failed: {e}")
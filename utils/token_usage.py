@@ -1,39 +1,157 @@
-from graph_orchestration.define_state import ResearcherState
-from langchain_core.messages import HumanMessage
-import uuid
-import time
+# -------------------------
+# MODEL PRICES
+# -------------------------
+
+# USD per million tokens: (input, cached input, output). Keys are model
+# names without the provider prefix; dated snapshots such as
+# "gpt-4o-2024-08-06" match their base name. Update when prices change.
+MODEL_PRICES_PER_MTOK = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "claude-sonnet-4": (3.00, 0.30, 15.00),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+}
+
+
+def model_prices(model: str):
+    """Price tuple for a model (longest matching name), or None if unknown."""
+    name = model.split(":", 1)[-1]
+    matches = [m for m in MODEL_PRICES_PER_MTOK if name.startswith(m)]
+    if not matches:
+        return None
+    return MODEL_PRICES_PER_MTOK[max(matches, key=len)]
+
+
+def estimate_cost(
+    model: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0
+) -> float:
+    """Dollar cost of one call; 0.0 for models missing from the price table."""
+    prices = model_prices(model)
+    if prices is None:
+        return 0.0
+
+    input_price, cached_price, output_price = prices
+    uncached = max(input_tokens - cached_input_tokens, 0)
+    return (
+        uncached * input_price
+        + cached_input_tokens * cached_price
+        + output_tokens * output_price
+    ) / 1_000_000
 
 
 # -------------------------
-# INIT STATE HELPER
+# TOKEN LOGGER
 # -------------------------
 
 
-def init_state(user_query: str) -> ResearcherState:
+def usage_from_response(resp) -> dict:
+    """Input/output/cached token counts of a chat model response.
+
+    LangChain's provider-neutral usage_metadata is preferred; raw provider
+    metadata (OpenAI "token_usage", Anthropic "usage") is the fallback for
+    integrations that do not fill it in.
+    """
+    usage = getattr(resp, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return {
+            "input": usage.get("input_tokens", 0) or 0,
+            "output": usage.get("output_tokens", 0) or 0,
+            "cached_input": details.get("cache_read", 0) or 0,
+        }
+
+    metadata = getattr(resp, "response_metadata", None) or {}
+    raw = metadata.get("token_usage") or metadata.get("usage") or {}
+    prompt_details = raw.get("prompt_tokens_details") or {}
     return {
-        "researcher_messages": [HumanMessage(content=user_query)],
-        "tool_metrics": {"total_calls": 0, "by_tool": {}, "calls": []},
-        "token_metrics": {"input": 0, "output": 0, "total": 0},
-        "loop_count": 0,
-        "run_id": str(uuid.uuid4()),
-        "start_time": time.time(),
+        "input": raw.get("prompt_tokens", raw.get("input_tokens", 0)) or 0,
+        "output": raw.get("completion_tokens", raw.get("output_tokens", 0)) or 0,
+        "cached_input": prompt_details.get("cached_tokens")
+        or raw.get("cache_read_input_tokens")
+        or 0,
     }
 
 
-# -------------------------
-# TOKEN LOGGER
-# -------------------------
+def empty_token_metrics() -> dict:
+    return {
+        "input": 0,
+        "output": 0,
+        "total": 0,
+        "cached_input": 0,
+        "cost_usd": 0.0,
+        "by_model": {},
+    }
+
+
+def call_token_metrics(resp, model: str | None = None) -> dict:
+    """token_metrics holding one response's tokens and estimated cost.
+
+    Nodes return it as their token_metrics update; merge_token_metrics (the
+    state reducer) adds it to the run's totals, so nodes that run in the
+    same step never overwrite each other's counts.
+
+    Args:
+        resp: Chat model response (AIMessage).
+        model: Configured "provider:model" string used for pricing; falls
+            back to the model name the provider reported.
+    """
+    usage = usage_from_response(resp)
+    metadata = getattr(resp, "response_metadata", None) or {}
+    model = model or metadata.get("model_name") or metadata.get("model") or "unknown"
+    cost = round(
+        estimate_cost(model, usage["input"], usage["output"], usage["cached_input"]), 6
+    )
+
+    return {
+        "input": usage["input"],
+        "output": usage["output"],
+        "total": usage["input"] + usage["output"],
+        "cached_input": usage["cached_input"],
+        "cost_usd": cost,
+        "by_model": {
+            model: {
+                "calls": 1,
+                "input": usage["input"],
+                "output": usage["output"],
+                "cached_input": usage["cached_input"],
+                "cost_usd": cost,
+            }
+        },
+    }
+
+
+_TOTAL_COUNTS = ("input", "output", "total", "cached_input")
+_MODEL_COUNTS = ("calls", "input", "output", "cached_input")
+
 
+def _add_counts(left: dict, right: dict, keys: tuple) -> dict:
+    merged = {key: left.get(key, 0) + right.get(key, 0) for key in keys}
+    cost = left.get("cost_usd", 0.0) + right.get("cost_usd", 0.0)
+    merged["cost_usd"] = round(cost, 6)
+    return merged
 
-def update_token_metrics(state: ResearcherState, resp):
-    usage = {}
 
-    if hasattr(resp, "response_metadata"):
-        usage = resp.response_metadata.get("token_usage", {})
+def merge_token_metrics(left: dict | None, right: dict | None) -> dict:
+    """State reducer: add two token_metrics dicts without mutating either."""
+    if not left:
+        return right or empty_token_metrics()
+    if not right:
+        return left
 
-    inp = usage.get("input_tokens", 0)
-    out = usage.get("output_tokens", 0)
+    by_model = dict(left.get("by_model", {}))
+    for model, stats in right.get("by_model", {}).items():
+        current = by_model.get(model)
+        by_model[model] = (
+            stats if current is None else _add_counts(current, stats, _MODEL_COUNTS)
+        )
 
-    state["token_metrics"]["input"] += inp
-    state["token_metrics"]["output"] += out
-    state["token_metrics"]["total"] += inp + out
+    merged = {**_add_counts(left, right, _TOTAL_COUNTS), "by_model": by_model}
+    cache_shares = left.get("cache_share_per_call", []) + right.get(
+        "cache_share_per_call", []
+    )
+    if cache_shares:
+        merged["cache_share_per_call"] = cache_shares
+    return merged
@@ -0,0 +1,174 @@
+import json
+from typing import Optional
+
+
+# -------------------------
+# COMPACT TOOL METRICS
+# -------------------------
+
+# tool_metrics lives in graph state and is serialized with every
+# checkpoint, so its size is bounded regardless of how many calls a run
+# makes: per-tool counters and fixed-bucket histograms, plus a ring
+# buffer of the most recent calls. tool_node returns the metrics of its
+# own calls and merge_tool_metrics (the state reducer) folds them in.
+
+RECENT_CALLS = 20
+ARGS_PREVIEW_CHARS = 200
+
+# histogram upper bounds; each histogram has one extra overflow bucket
+LATENCY_BUCKETS_SEC = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PAYLOAD_BUCKETS_CHARS = (1_000, 4_000, 16_000, 64_000, 256_000)
+
+
+def empty_tool_metrics() -> dict:
+    return {
+        "total_calls": 0,
+        "errors": 0,
+        "by_tool": {},
+        "recent_calls": [],
+        "cache": {"hits": 0, "misses": 0},
+        "tokens_saved": 0,
+        "duplicates_removed": 0,
+        "histogram_buckets": {
+            "latency_sec": list(LATENCY_BUCKETS_SEC),
+            "payload_chars": list(PAYLOAD_BUCKETS_CHARS),
+        },
+    }
+
+
+def _empty_tool_stats() -> dict:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "latency_sec_total": 0.0,
+        "payload_chars_total": 0,
+        "latency_hist": [0] * (len(LATENCY_BUCKETS_SEC) + 1),
+        "payload_hist": [0] * (len(PAYLOAD_BUCKETS_CHARS) + 1),
+    }
+
+
+def _bucket(value: float, bounds: tuple) -> int:
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def cache_statuses(call_stats: dict) -> dict:
+    """Search cache status per provider used, e.g. {"cache_tavily": "hit"}."""
+    return {k: v for k, v in call_stats.items() if k.startswith("cache_")}
+
+
+def _args_preview(args: dict) -> str:
+    text = json.dumps(args, default=str, ensure_ascii=False)
+    if len(text) > ARGS_PREVIEW_CHARS:
+        return text[:ARGS_PREVIEW_CHARS] + "..."
+    return text
+
+
+def record_tool_call(
+    metrics: dict,
+    tool: str,
+    args: dict,
+    observation: str,
+    call_stats: dict,
+    loop: Optional[int] = None,
+) -> dict:
+    """Add one tool call to metrics (in place) and return metrics.
+
+    Args:
+        metrics: Metrics to update, usually a fresh empty_tool_metrics()
+            holding just this tool_node round.
+        tool: Tool name.
+        args: Tool call arguments (only a short preview is kept).
+        observation: String returned to the model.
+        call_stats: Side-channel stats recorded during the call
+            (latency_sec, cache_<provider>, tokens_saved, duplicates_removed,
+            error, hedge).
+        loop: Research loop the call belongs to.
+    """
+    latency = call_stats.get("latency_sec", 0.0)
+    payload_chars = len(observation)
+    error = call_stats.get("error")
+
+    tool_stats = metrics["by_tool"].setdefault(tool, _empty_tool_stats())
+    tool_stats["calls"] += 1
+    tool_stats["latency_sec_total"] = round(
+        tool_stats["latency_sec_total"] + latency, 4
+    )
+    tool_stats["payload_chars_total"] += payload_chars
+    tool_stats["latency_hist"][_bucket(latency, LATENCY_BUCKETS_SEC)] += 1
+    tool_stats["payload_hist"][_bucket(payload_chars, PAYLOAD_BUCKETS_CHARS)] += 1
+
+    metrics["total_calls"] += 1
+    if error:
+        tool_stats["errors"] += 1
+        metrics["errors"] += 1
+
+    cache = cache_statuses(call_stats)
+    for cache_status in cache.values():
+        if cache_status in ("hit", "miss"):
+            metrics["cache"]["hits" if cache_status == "hit" else "misses"] += 1
+
+    metrics["tokens_saved"] += call_stats.get("tokens_saved", 0)
+    metrics["duplicates_removed"] += call_stats.get("duplicates_removed", 0)
+
+    call_record = {
+        "tool": tool,
+        "loop": loop,
+        "args": _args_preview(args),
+        "latency_sec": round(latency, 4),
+        "payload_chars": payload_chars,
+    }
+    if cache:
+        call_record["cache"] = {k[len("cache_") :]: v for k, v in cache.items()}
+    for key in ("tokens_saved", "error", "hedge"):
+        if call_stats.get(key):
+            call_record[key] = call_stats[key]
+    metrics["recent_calls"] = (metrics["recent_calls"] + [call_record])[-RECENT_CALLS:]
+
+    return metrics
+
+
+def _add_lists(left: list, right: list) -> list:
+    return [a + b for a, b in zip(left, right)]
+
+
+def merge_tool_metrics(left: Optional[dict], right: Optional[dict]) -> dict:
+    """State reducer: combine two tool_metrics dicts without mutating either."""
+    if not left:
+        return right or empty_tool_metrics()
+    if not right:
+        return left
+
+    by_tool = dict(left["by_tool"])
+    for tool, stats in right["by_tool"].items():
+        if tool not in by_tool:
+            by_tool[tool] = stats
+            continue
+        current = by_tool[tool]
+        by_tool[tool] = {
+            "calls": current["calls"] + stats["calls"],
+            "errors": current["errors"] + stats["errors"],
+            "latency_sec_total": round(
+                current["latency_sec_total"] + stats["latency_sec_total"], 4
+            ),
+            "payload_chars_total": current["payload_chars_total"]
+            + stats["payload_chars_total"],
+            "latency_hist": _add_lists(current["latency_hist"], stats["latency_hist"]),
+            "payload_hist": _add_lists(current["payload_hist"], stats["payload_hist"]),
+        }
+
+    return {
+        "total_calls": left["total_calls"] + right["total_calls"],
+        "errors": left["errors"] + right["errors"],
+        "by_tool": by_tool,
+        "recent_calls": (left["recent_calls"] + right["recent_calls"])[-RECENT_CALLS:],
+        "cache": {
+            "hits": left["cache"]["hits"] + right["cache"]["hits"],
+            "misses": left["cache"]["misses"] + right["cache"]["misses"],
+        },
+        "tokens_saved": left["tokens_saved"] + right["tokens_saved"],
+        "duplicates_removed": left["duplicates_removed"] + right["duplicates_removed"],
+        "histogram_buckets": left["histogram_buckets"],
+    }